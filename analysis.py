@@ -0,0 +1,134 @@
+"""Análise de rostos em uma única passada: detecção, landmarks e encodings juntos
+
+`face_recognition.face_landmarks` e `face_recognition.face_encodings` detectam os rostos de
+novo quando não recebem as caixas, e cada um roda o seu próprio shape predictor. Aqui a
+detecção é feita uma vez por imagem (ou por lote), o shape predictor uma vez por rosto, e as
+mesmas formas alimentam os landmarks e o encoding.
+
+    result = analyze(rgb_image, landmarks="large")
+    result.locations   # (N, 4) int32, (top, right, bottom, left)
+    result.landmarks   # (N, 68, 2) int32 (ou (N, 5, 2) com "small")
+    result.encodings   # (N, 128) float32
+"""
+import numpy as np
+
+from gallery import ENCODING_DIM
+
+LANDMARK_POINTS = {"small": 5, "large": 68}
+
+# Grupos de pontos no formato devolvido pelo face_recognition.face_landmarks
+FEATURES_68 = {
+    "chin": list(range(0, 17)),
+    "left_eyebrow": list(range(17, 22)),
+    "right_eyebrow": list(range(22, 27)),
+    "nose_bridge": list(range(27, 31)),
+    "nose_tip": list(range(31, 36)),
+    "left_eye": list(range(36, 42)),
+    "right_eye": list(range(42, 48)),
+    "top_lip": list(range(48, 55)) + [64, 63, 62, 61, 60],
+    "bottom_lip": list(range(54, 60)) + [48, 60, 67, 66, 65, 64],
+}
+FEATURES_5 = {
+    "nose_tip": [4],
+    "left_eye": [2, 3],
+    "right_eye": [0, 1],
+}
+
+
+class FaceAnalysis:
+    """Resultado de `analyze` para uma imagem: arrays paralelos, um rosto por linha
+
+    `landmarks` e `encodings` são None quando não foram pedidos.
+    """
+
+    __slots__ = ("locations", "landmarks", "encodings")
+
+    def __init__(self, locations, landmarks=None, encodings=None):
+        self.locations = locations
+        self.landmarks = landmarks
+        self.encodings = encodings
+
+    def __len__(self):
+        return len(self.locations)
+
+    def landmark_dicts(self):
+        """Landmarks no formato de face_recognition.face_landmarks (lista de dicts por rosto)"""
+        if self.landmarks is None:
+            return []
+        features = FEATURES_68 if self.landmarks.shape[1] == 68 else FEATURES_5
+        return [{name: [tuple(int(v) for v in points[i]) for i in idx] for name, idx in features.items()}
+                for points in self.landmarks]
+
+
+def _shape_predictor(model):
+    from face_recognition import api
+    return api.pose_predictor_68_point if model == "large" else api.pose_predictor_5_point
+
+
+def _analyze_faces(rgb_image, locations, landmarks, encodings, num_jitters):
+    """Landmarks e encodings de rostos já detectados, com um shape predictor por rosto"""
+    import dlib
+    from face_recognition import api
+
+    locations = np.asarray(locations, dtype=np.int32).reshape(-1, 4)
+    if not (landmarks or encodings) or not len(locations):
+        n = len(locations)
+        return FaceAnalysis(
+            locations,
+            np.empty((n, LANDMARK_POINTS[landmarks], 2), dtype=np.int32) if landmarks else None,
+            np.empty((n, ENCODING_DIM), dtype=np.float32) if encodings else None)
+
+    # Sem landmarks pedidos, o encoding usa o modelo de 5 pontos (o padrão de face_encodings)
+    predictor = _shape_predictor(landmarks or "small")
+    shapes = dlib.full_object_detections()
+    for top, right, bottom, left in locations:
+        shapes.append(predictor(rgb_image, dlib.rectangle(int(left), int(top), int(right), int(bottom))))
+
+    points = None
+    if landmarks:
+        points = np.array([[(p.x, p.y) for p in shape.parts()] for shape in shapes], dtype=np.int32)
+
+    descriptors = None
+    if encodings:
+        # Todos os rostos da imagem em uma única chamada da rede
+        descriptors = np.asarray(api.face_encoder.compute_face_descriptor(rgb_image, shapes, num_jitters),
+                                 dtype=np.float32).reshape(-1, ENCODING_DIM)
+    return FaceAnalysis(locations, points, descriptors)
+
+
+def _resolve_detector(detector):
+    if detector is None or isinstance(detector, str):
+        from detectors import get_detector
+        return get_detector(detector)
+    return detector
+
+
+def analyze(rgb_image, detector=None, locations=None, landmarks=None, encodings=True, num_jitters=1):
+    """Detecta (uma vez) e analisa os rostos de uma imagem RGB
+
+    - `detector`: um detectors.FaceDetector ou nome do backend (padrão: FACE_DETECTOR)
+    - `locations`: caixas já conhecidas (por exemplo do DetectionScheduler); pula a detecção
+    - `landmarks`: None, "small" (5 pontos) ou "large" (68 pontos)
+    - `encodings`: calcula os encodings a partir das mesmas formas dos landmarks. Com "large",
+      equivalem a face_encodings(model="large")
+    """
+    if landmarks is not None and landmarks not in LANDMARK_POINTS:
+        raise ValueError(f"landmarks deve ser None, 'small' ou 'large', não {landmarks!r}")
+    if locations is None:
+        locations = _resolve_detector(detector).detect(rgb_image)
+    return _analyze_faces(rgb_image, locations, landmarks, encodings, num_jitters)
+
+
+def analyze_batch(rgb_images, detector=None, landmarks=None, encodings=True, num_jitters=1):
+    """Como `analyze`, para várias imagens: a detecção vai em lote (detect_batch, ex. CNN na GPU)"""
+    if landmarks is not None and landmarks not in LANDMARK_POINTS:
+        raise ValueError(f"landmarks deve ser None, 'small' ou 'large', não {landmarks!r}")
+    all_locations = _resolve_detector(detector).detect_batch(list(rgb_images))
+    return [_analyze_faces(image, locations, landmarks, encodings, num_jitters)
+            for image, locations in zip(rgb_images, all_locations)]
+
+
+def encode_faces(rgb_image, locations, num_jitters=1):
+    """Substituto de face_recognition.face_encodings(rgb_image, locations): (N, 128) float32,
+    com todos os rostos em uma única chamada da rede"""
+    return _analyze_faces(rgb_image, locations, None, True, num_jitters).encodings
@@ -0,0 +1,210 @@
+import numpy as np
+
+from gallery import ENCODING_DIM
+
+
+def _sq_distances(a, b, b_sq=None):
+    """Distâncias euclidianas ao quadrado (len(a) x len(b))"""
+    if b_sq is None:
+        b_sq = np.einsum("ij,ij->i", b, b)
+    d = np.einsum("ij,ij->i", a, a)[:, None] + b_sq[None, :] - 2.0 * (a @ b.T)
+    return np.maximum(d, 0.0, out=d)
+
+
+def _assign(data, centroids, chunk=65536):
+    """Índice do centróide mais próximo de cada linha, processado em blocos para limitar a memória"""
+    c_sq = np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), chunk):
+        labels[start:start + chunk] = np.argmin(_sq_distances(data[start:start + chunk], centroids, c_sq), axis=1)
+    return labels
+
+
+def kmeans(data, k, iterations=10, seed=0):
+    """K-means (Lloyd) simples em NumPy; retorna os centróides float32"""
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype=np.float32)
+    centroids = data[rng.choice(len(data), size=k, replace=len(data) < k)].copy()
+
+    for _ in range(iterations):
+        labels = _assign(data, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Clusters vazios recebem pontos aleatórios para não desperdiçar listas
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), size=len(empty))]
+    return centroids
+
+
+class IVFIndex:
+    """Índice aproximado (IVF) para encodings de 128 dimensões, com quantização de produto opcional
+
+    nlist: número de listas invertidas (clusters)
+    nprobe: número de listas visitadas por consulta (mais = maior recall, mais lento)
+    pq_m: número de sub-vetores da quantização de produto (0 = guarda os vetores completos)
+    """
+
+    def __init__(self, nlist=1024, nprobe=8, pq_m=0, pq_bits=8):
+        if pq_m and ENCODING_DIM % pq_m:
+            raise ValueError(f"pq_m deve dividir {ENCODING_DIM}")
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.pq_ksub = 2 ** pq_bits
+
+        self.centroids = None
+        self.codebooks = None  # (pq_m, ksub, dsub)
+        self.vectors = np.empty((0, ENCODING_DIM), dtype=np.float32)
+        self.codes = np.empty((0, pq_m), dtype=np.uint8)
+        self.labels = np.empty(0, dtype=np.int64)
+        self.names = np.empty(0, dtype=object)
+        self._lists = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def train(self, encodings, iterations=10, max_samples=100000, seed=0):
+        """Treina os centróides (e os codebooks da PQ) a partir de uma amostra dos encodings"""
+        data = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        rng = np.random.default_rng(seed)
+        if len(data) > max_samples:
+            data = data[rng.choice(len(data), size=max_samples, replace=False)]
+
+        self.nlist = min(self.nlist, len(data))
+        self.centroids = kmeans(data, self.nlist, iterations, seed)
+
+        if self.pq_m:
+            residuals = data - self.centroids[_assign(data, self.centroids)]
+            dsub = ENCODING_DIM // self.pq_m
+            self.codebooks = np.stack([
+                kmeans(residuals[:, m * dsub:(m + 1) * dsub], self.pq_ksub, iterations, seed + m)
+                for m in range(self.pq_m)
+            ])
+
+    def _encode(self, residuals):
+        dsub = ENCODING_DIM // self.pq_m
+        codes = np.empty((len(residuals), self.pq_m), dtype=np.uint8 if self.pq_ksub <= 256 else np.uint16)
+        for m in range(self.pq_m):
+            codes[:, m] = _assign(residuals[:, m * dsub:(m + 1) * dsub], self.codebooks[m])
+        return codes
+
+    def add(self, encodings, names):
+        """Inclui encodings já com o índice treinado"""
+        if not self.is_trained:
+            raise RuntimeError("o índice precisa ser treinado antes de add()")
+        data = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if len(names) != len(data):
+            raise ValueError("encodings e names devem ter o mesmo tamanho")
+
+        labels = _assign(data, self.centroids)
+        if self.pq_m:
+            self.codes = np.concatenate([self.codes, self._encode(data - self.centroids[labels])])
+        else:
+            self.vectors = np.concatenate([self.vectors, data])
+        self.labels = np.concatenate([self.labels, labels])
+        self.names = np.concatenate([self.names, np.array(list(names), dtype=object)])
+        self._lists = None
+
+    def build(self, encodings, names, **train_kwargs):
+        """Treina e inclui todos os encodings de uma vez"""
+        self.train(encodings, **train_kwargs)
+        self.add(encodings, names)
+        return self
+
+    def _inverted_lists(self):
+        """Ids de cada lista invertida, recalculados apenas depois de um add()"""
+        if self._lists is None:
+            order = np.argsort(self.labels, kind="stable")
+            bounds = np.searchsorted(self.labels[order], np.arange(self.nlist + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.nlist)]
+        return self._lists
+
+    def search(self, queries, k=1, nprobe=None):
+        """Retorna (ids, distâncias) dos k vizinhos aproximados de cada consulta
+
+        Posições sem candidato suficiente recebem id -1 e distância infinita.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        dists = np.full((len(queries), k), np.inf, dtype=np.float32)
+        if len(self) == 0 or len(queries) == 0:
+            return ids, dists
+
+        lists = self._inverted_lists()
+        coarse = _sq_distances(queries, self.centroids)
+        probes = np.argpartition(coarse, nprobe - 1, axis=1)[:, :nprobe] if nprobe < self.nlist \
+            else np.tile(np.arange(self.nlist), (len(queries), 1))
+
+        for qi, query in enumerate(queries):
+            if self.pq_m:
+                cand, sq = self._search_pq(query, probes[qi], lists)
+            else:
+                cand = np.concatenate([lists[p] for p in probes[qi]])
+                sq = _sq_distances(query[None, :], self.vectors[cand])[0]
+            if len(cand) == 0:
+                continue
+
+            n = min(k, len(cand))
+            top = np.argpartition(sq, n - 1)[:n] if n < len(cand) else np.arange(len(cand))
+            top = top[np.argsort(sq[top])]
+            ids[qi, :n] = cand[top]
+            dists[qi, :n] = np.sqrt(sq[top])
+        return ids, dists
+
+    def _search_pq(self, query, probes, lists):
+        """Distância assimétrica (ADC): tabelas por sub-vetor sobre o resíduo da consulta em cada lista"""
+        dsub = ENCODING_DIM // self.pq_m
+        cand_all, sq_all = [], []
+        for p in probes:
+            cand = lists[p]
+            if len(cand) == 0:
+                continue
+            residual = (query - self.centroids[p]).reshape(self.pq_m, 1, dsub)
+            tables = np.sum((self.codebooks - residual) ** 2, axis=2)  # (pq_m, ksub)
+            codes = self.codes[cand]
+            sq_all.append(tables[np.arange(self.pq_m), codes].sum(axis=1))
+            cand_all.append(cand)
+        if not cand_all:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(cand_all), np.concatenate(sq_all)
+
+    def nearest(self, queries, tolerance=0.6, unknown=None, nprobe=None):
+        """Mesma interface de FaceGallery.nearest, usando a busca aproximada"""
+        ids, dists = self.search(queries, k=1, nprobe=nprobe)
+        names = [self.names[i] if i >= 0 and d <= tolerance else unknown for i, d in zip(ids[:, 0], dists[:, 0])]
+        return names, dists[:, 0]
+
+    def save(self, path):
+        np.savez(
+            path,
+            params=np.array([self.nlist, self.nprobe, self.pq_m, self.pq_ksub]),
+            centroids=self.centroids,
+            codebooks=self.codebooks if self.codebooks is not None else np.empty(0, dtype=np.float32),
+            vectors=self.vectors,
+            codes=self.codes,
+            labels=self.labels,
+            names=np.array([str(n) for n in self.names]),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            nlist, nprobe, pq_m, ksub = (int(v) for v in data["params"])
+            index = cls(nlist=nlist, nprobe=nprobe, pq_m=pq_m, pq_bits=int(np.log2(ksub)))
+            index.centroids = data["centroids"]
+            index.codebooks = data["codebooks"] if pq_m else None
+            index.vectors = data["vectors"]
+            index.codes = data["codes"]
+            index.labels = data["labels"]
+            index.names = data["names"].astype(object)
+        return index
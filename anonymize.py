@@ -0,0 +1,162 @@
+"""Anonimização de rostos em vídeo: ao vivo (webcam) ou offline (arquivo inteiro)
+
+Métodos: pixelização (reduz e amplia), blur de caixa ou blur gaussiano com kernel proporcional
+ao tamanho do rosto. A detecção roda em um frame reduzido e só a cada N frames; as caixas
+continuam cobertas nos frames sem detecção e por alguns frames depois que o detector perde o
+rosto, para que ele nunca apareça sem desfoque.
+
+Uso: python anonymize.py 0 --method pixelate
+     python anonymize.py gravacao.mp4 --output anonimo.mp4 --detector ssd --skip 2
+"""
+import argparse
+import time
+
+import cv2
+
+from scheduler import DetectionScheduler
+from tracking import FaceTracker
+
+
+def pixelate(roi, blocks=12):
+    """Pixelização: reduz a região para `blocks` blocos na largura e amplia de volta"""
+    h, w = roi.shape[:2]
+    small = cv2.resize(roi, (blocks, max(1, blocks * h // w)), interpolation=cv2.INTER_AREA)
+    cv2.resize(small, (w, h), dst=roi, interpolation=cv2.INTER_NEAREST)
+
+
+def box_blur(roi, strength=0.3):
+    """Blur de caixa com kernel proporcional ao tamanho do rosto"""
+    k = max(3, int(min(roi.shape[:2]) * strength))
+    cv2.blur(roi, (k, k), dst=roi)
+
+
+def gaussian_blur(roi, strength=0.3):
+    """Blur gaussiano com kernel (ímpar) proporcional ao tamanho do rosto"""
+    k = max(3, int(min(roi.shape[:2]) * strength)) | 1
+    cv2.GaussianBlur(roi, (k, k), 0, dst=roi)
+
+
+METHODS = {
+    "pixelate": pixelate,
+    "box": box_blur,
+    "gaussian": gaussian_blur,
+}
+
+
+def expand(location, margin, shape):
+    """Aumenta a caixa (top, right, bottom, left) em `margin` do seu tamanho, dentro do frame"""
+    top, right, bottom, left = location
+    dy, dx = int((bottom - top) * margin), int((right - left) * margin)
+    h, w = shape[:2]
+    return max(top - dy, 0), min(right + dx, w), min(bottom + dy, h), max(left - dx, 0)
+
+
+class Anonymizer:
+    """Detecta (espaçadamente) e cobre os rostos de frames BGR, no próprio frame
+
+    - `scale`, `skip` e `target_fps` vão para o DetectionScheduler
+    - `hold`: detecções seguidas em que um rosto pode sumir e continuar coberto
+    - `margin`: folga em volta da caixa, para cobrir o movimento entre detecções
+    """
+
+    def __init__(self, detector=None, method="pixelate", scale=0.25, skip=0, target_fps=None,
+                 hold=3, margin=0.2, **method_kwargs):
+        if isinstance(detector, str) or detector is None:
+            from detectors import get_detector
+            detector = get_detector(detector)
+        if method not in METHODS:
+            raise ValueError(f"método desconhecido: {method} (opções: {', '.join(METHODS)})")
+        self.detector = detector
+        self.method = method
+        self.margin = margin
+        self._apply = METHODS[method]
+        self._method_kwargs = method_kwargs
+        # Os detectores recebem RGB; a conversão é feita só no frame já reduzido
+        self.scheduler = DetectionScheduler(
+            detect=lambda small: detector(cv2.cvtColor(small, cv2.COLOR_BGR2RGB)),
+            scale=scale, skip=skip, target_fps=target_fps, max_scale=max(scale, 0.5))
+        self.tracker = FaceTracker(max_misses=hold)
+
+    def locations(self, frame):
+        """Caixas a cobrir neste frame: as detectadas agora e as perdidas há no máximo `hold` detecções"""
+        found = self.scheduler.locations(frame)
+        if self.scheduler.fresh:
+            self.tracker.update(found)
+        return [expand(track.location, self.margin, frame.shape) for track in self.tracker.tracks]
+
+    def apply(self, frame):
+        """Anonimiza o frame no lugar e retorna as caixas cobertas"""
+        boxes = self.locations(frame)
+        for top, right, bottom, left in boxes:
+            if bottom - top > 1 and right - left > 1:
+                self._apply(frame[top:bottom, left:right], **self._method_kwargs)
+        return boxes
+
+    __call__ = apply
+
+
+def run_live(source, anonymizer):
+    capture = cv2.VideoCapture(source)
+    while True:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        anonymizer.apply(frame)
+        cv2.imshow("Anonimizado", frame)
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            break
+    capture.release()
+    cv2.destroyAllWindows()
+    print(anonymizer.scheduler)
+
+
+def run_offline(source, output, anonymizer):
+    """Processa o arquivo inteiro, frame a frame, sem pular nenhum frame na saída"""
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise SystemExit(f"não foi possível abrir {source}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    fourcc = cv2.VideoWriter_fourcc(*("mp4v" if output.lower().endswith(".mp4") else "MJPG"))
+    writer = cv2.VideoWriter(output, fourcc, fps, size)
+
+    start = time.perf_counter()
+    frames = 0
+    while True:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        anonymizer.apply(frame)
+        writer.write(frame)
+        frames += 1
+    elapsed = time.perf_counter() - start
+    capture.release()
+    writer.release()
+    print(f"{frames} frames em {elapsed:.1f}s: {frames / elapsed:.1f} fps "
+          f"({frames / fps / elapsed:.1f}x tempo real)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", nargs="?", default="0", help="índice da câmera ou arquivo de vídeo")
+    parser.add_argument("--output", help="modo offline: grava o vídeo anonimizado neste arquivo")
+    parser.add_argument("--method", choices=list(METHODS), default="pixelate")
+    parser.add_argument("--detector", choices=["hog", "cnn", "ssd"], default="hog")
+    parser.add_argument("--scale", type=float, default=0.25, help="escala do frame para a detecção")
+    parser.add_argument("--skip", type=int, default=0, help="frames sem detecção entre duas detecções")
+    parser.add_argument("--target-fps", type=float, help="ao vivo: ajusta escala e salto para este fps")
+    parser.add_argument("--hold", type=int, default=3, help="detecções em que um rosto perdido continua coberto")
+    parser.add_argument("--margin", type=float, default=0.2)
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    anonymizer = Anonymizer(args.detector, args.method, args.scale, args.skip,
+                            None if args.output else args.target_fps, args.hold, args.margin)
+    if args.output:
+        run_offline(source, args.output, anonymizer)
+    else:
+        run_live(source, anonymizer)
+
+
+if __name__ == "__main__":
+    main()
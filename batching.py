@@ -0,0 +1,59 @@
+import asyncio
+
+
+class MicroBatcher:
+    """Agrupa requisições concorrentes em lotes, no event loop
+
+    Cada `submit(item)` espera no máximo `max_delay` segundos (ou até o lote ter `max_batch`
+    itens); o lote inteiro é então processado por `process(items) -> resultados`, na mesma ordem.
+    Um resultado que é uma exceção é levantado só para o item correspondente.
+    """
+
+    def __init__(self, process, max_batch=8, max_delay=0.005):
+        self.process = process
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.items = 0
+        self._pending = []
+        self._timer = None
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.process([item for item, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @property
+    def mean_batch_size(self):
+        return self.items / self.batches if self.batches else 0.0
@@ -0,0 +1,96 @@
+"""Gerador de carga local para a API (outros/api.py): requisições/s e latência
+
+Suba o servidor antes (cd outros && python api.py) e compare, por exemplo:
+    python benchmarks/bench_api.py --mode single --concurrency 8
+    FACE_MICROBATCH_MS=0 (no servidor) para medir /uploadfile/ sem micro-lotes
+    python benchmarks/bench_api.py --mode batch --batch-size 16
+"""
+import argparse
+import http.client
+import os
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def multipart(field, files):
+    """Corpo multipart/form-data para uma lista de (nome do arquivo, bytes)"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for filename, data in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n".encode() + data + b"\r\n")
+    body = b"".join(parts) + f"--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def worker(url, path, body, content_type, count, latencies, errors):
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=120)
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": content_type})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as exc:
+            errors.append(type(exc).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=120)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5001")
+    parser.add_argument("--mode", choices=["single", "batch"], default="single")
+    parser.add_argument("--image", default=os.path.join(ROOT, "outros", "obama.jpg"))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=64, help="requisições por conexão")
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        image = f.read()
+    name = os.path.basename(args.image)
+    if args.mode == "single":
+        path, images_per_request = "/uploadfile/", 1
+        body, content_type = multipart("file", [(name, image)])
+    else:
+        path, images_per_request = "/uploadfiles/", args.batch_size
+        body, content_type = multipart("files", [(f"{i}_{name}", image) for i in range(args.batch_size)])
+
+    url = urlparse(args.url)
+    latencies, errors = [], []
+    threads = [threading.Thread(target=worker, args=(url, path, body, content_type, args.requests, latencies, errors))
+               for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    ok = len(latencies)
+    print(f"{args.mode}: {ok} ok, {len(errors)} erros em {elapsed:.1f}s")
+    print(f"  {ok / elapsed:.1f} req/s, {ok * images_per_request / elapsed:.1f} imagens/s")
+    print(f"  latência p50={percentile(latencies, 0.5) * 1000:.0f} ms  p95={percentile(latencies, 0.95) * 1000:.0f} ms")
+    if errors:
+        print(f"  erros: {sorted(set(map(str, errors)))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Benchmark da entrada de imagens grandes: latência e pico de memória por caminho de decodificação
+
+Amplia outros/biden.jpg para fotos de celular (12 e 24 MP, JPEG e PNG) e compara:
+
+- base:      o que face_recognition.load_image_file faz (decodifica tudo e copia para numpy)
+- detecção:  ingest.detection_image (JPEG em escala reduzida, no máximo --max-side)
+- recortes:  ingest.face_regions (resolução total no buffer do PIL, só os rostos em numpy)
+- ingest:    detecção + recortes, o caminho completo de ingest.encode_bytes sem as redes
+
+Cada medida roda em um processo novo, para que o pico de memória (VmHWM) seja só dela.
+Com face_recognition instalado, mede também o HOG na imagem inteira e na reduzida.
+
+Uso: python benchmarks/bench_ingest.py --megapixels 12 24 --repeat 3
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import ingest
+
+METHODS = ("base", "detecção", "recortes", "ingest", "hog base", "hog reduzido")
+
+
+def make_photo(path, megapixels, fmt):
+    """Foto do repositório em 4:3, ampliada para `megapixels`, com ruído leve para o JPEG não ficar trivial"""
+    source = Image.open(os.path.join(ROOT, "outros", "biden.jpg")).convert("RGB")
+    source = source.crop((0, 0, source.width, source.width * 3 // 4))
+    factor = (megapixels * 1e6 / (source.width * source.height)) ** 0.5
+    image = source.resize((int(source.width * factor), int(source.height * factor)), Image.BICUBIC)
+    noise = np.random.default_rng(0).integers(-6, 7, size=(image.height, image.width, 1), dtype=np.int16)
+    image = Image.fromarray(np.clip(np.asarray(image, dtype=np.int16) + noise, 0, 255).astype(np.uint8))
+    image.save(path, quality=90) if fmt == "jpeg" else image.save(path, compress_level=1)
+    return image.size
+
+
+def face_boxes(size, count=3):
+    """Caixas de rostos de ~8% da largura (as posições não importam para o custo da decodificação)"""
+    width, height = size
+    side = width // 12
+    return [(height // 4 + i * side, width // 4 + (i + 1) * 2 * side, height // 4 + (i + 1) * side, width // 4 + i * 2 * side)
+            for i in range(count)]
+
+
+def peak_rss_kb():
+    """Pico de memória residente deste processo, em KB
+
+    VmHWM é por espaço de endereçamento; ru_maxrss herdaria o pico do processo pai (do fork).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_method(method, path, max_side):
+    """Executado no processo filho: (segundos, MB de pico acima do processo já importado)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    before = peak_rss_kb()
+    start = time.perf_counter()
+    if method == "base":
+        image = np.array(Image.open(path).convert("RGB"))
+    elif method == "detecção":
+        image, _ = ingest.detection_image(ingest.open_image(data), max_side)
+    elif method == "recortes":
+        image = ingest.open_image(data)
+        image = ingest.face_regions(image, face_boxes(image.size))
+    elif method == "ingest":
+        image = ingest.open_image(data)
+        size = image.size
+        small, _ = ingest.detection_image(image, max_side)
+        image = ingest.face_regions(ingest.full_resolution(image, size, data), face_boxes(size))
+    else:
+        import face_recognition
+        if method == "hog base":
+            image = face_recognition.face_locations(np.array(Image.open(path).convert("RGB")))
+        else:
+            image = face_recognition.face_locations(ingest.detection_image(ingest.open_image(data), max_side)[0])
+    elapsed = time.perf_counter() - start
+    peak = (peak_rss_kb() - before) / 1024.0
+    return elapsed, peak
+
+
+def measure(method, path, max_side, repeat):
+    """Mediana de `repeat` processos novos; None se a dependência não estiver instalada"""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, __file__, "--child", method, path, "--max-side", str(max_side)],
+                             capture_output=True, text=True)
+        if out.returncode:
+            if "ModuleNotFoundError" in out.stderr:
+                return None
+            raise RuntimeError(out.stderr.strip().splitlines()[-1])
+        runs.append(json.loads(out.stdout))
+    runs.sort(key=lambda r: r[0])
+    return runs[len(runs) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[12, 24])
+    parser.add_argument("--formats", nargs="+", default=["jpeg", "png"])
+    parser.add_argument("--max-side", type=int, default=ingest.DETECT_MAX_SIDE)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs=2, metavar=("MÉTODO", "ARQUIVO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_method(args.child[0], args.child[1], args.max_side)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for fmt in args.formats:
+            for megapixels in args.megapixels:
+                path = os.path.join(tmpdir, f"foto_{megapixels:g}mp.{'jpg' if fmt == 'jpeg' else 'png'}")
+                width, height = make_photo(path, megapixels, fmt)
+                print(f"{fmt} {width}x{height} ({os.path.getsize(path) / 2**20:.1f} MB no disco), lado máximo {args.max_side}:")
+                base = None
+                for method in METHODS:
+                    result = measure(method, path, args.max_side, args.repeat)
+                    if result is None:
+                        print(f"  {method:13s}: (face_recognition não instalado)")
+                        continue
+                    elapsed, peak = result
+                    if method == "base":
+                        base = result
+                    gain = f"  ({base[0] / elapsed:4.1f}x mais rápido)" if base and method in ("detecção", "ingest") else ""
+                    print(f"  {method:13s}: {elapsed * 1000:8.1f} ms  pico +{peak:6.1f} MB{gain}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark do detector SSD em CPU: frames/s por tamanho de lote
+
+Uso: python benchmarks/bench_ssd.py --batch 1 4 16 --frames 64
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from ssd_detector import SSDDetector
+
+
+def load_frames(count, size=(640, 480)):
+    """Frames de teste a partir das fotos do repositório, redimensionadas para o tamanho da webcam"""
+    images = [cv2.imread(os.path.join(ROOT, "outros", name)) for name in ("obama.jpg", "biden.jpg")]
+    images = [cv2.resize(image, size) for image in images if image is not None]
+    if not images:
+        images = [np.random.default_rng(0).integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)]
+    return [images[i % len(images)] for i in range(count)]
+
+
+def legacy_detect(net, frame):
+    """Caminho antigo de vision.py/teste1.py: um blob por frame e laço Python sobre as detecções"""
+    h, w = frame.shape[:2]
+    blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
+    net.setInput(blob)
+    detections = net.forward()
+    boxes = []
+    for i in range(detections.shape[2]):
+        if detections[0, 0, i, 2] > 0.5:
+            boxes.append((detections[0, 0, i, 3:7] * np.array([w, h, w, h])).astype("int"))
+    return boxes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--frames", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=0, help="threads do OpenCV (0 = padrão)")
+    args = parser.parse_args()
+
+    if args.threads:
+        cv2.setNumThreads(args.threads)
+
+    detector = SSDDetector()
+    frames = load_frames(args.frames)
+    detector.detect(frames[0])  # aquecimento
+
+    start = time.perf_counter()
+    for frame in frames:
+        legacy_detect(detector.net, frame)
+    print(f"legado   : {len(frames) / (time.perf_counter() - start):7.1f} frames/s")
+
+    for batch in args.batch:
+        start = time.perf_counter()
+        for i in range(0, len(frames), batch):
+            detector.detect_batch(frames[i:i + batch])
+        print(f"lote {batch:3d} : {len(frames) / (time.perf_counter() - start):7.1f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
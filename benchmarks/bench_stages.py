@@ -0,0 +1,272 @@
+"""Benchmark por estágio: carga, detecção, landmarks, encoding, análise e busca na galeria
+
+Usa outros/obama.jpg e outros/biden.jpg, reescaladas para várias resoluções e também em
+mosaico (vários rostos por imagem). Cada estágio é medido separadamente e o resultado vai
+para um JSON; com --compare, os tempos são comparados a um JSON salvo antes e as regressões
+acima de --threshold são apontadas (código de saída 1).
+
+Uso: python benchmarks/bench_stages.py --output base.json
+     python benchmarks/bench_stages.py --output novo.json --compare base.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from gallery import ENCODING_DIM, FaceGallery
+
+PHOTOS = ("obama.jpg", "biden.jpg")
+STAGES = ("load", "detect", "landmarks", "encode", "analyze", "match")
+
+
+def load_photos():
+    """Fotos do repositório em BGR"""
+    photos = {}
+    for name in PHOTOS:
+        image = cv2.imread(os.path.join(ROOT, "outros", name))
+        if image is not None:
+            photos[os.path.splitext(name)[0]] = image
+    if not photos:
+        raise SystemExit("fotos de teste não encontradas em outros/")
+    return photos
+
+
+def make_variants(photos, widths, tile):
+    """Variantes sintéticas: cada foto reescalada para as larguras pedidas e um mosaico tile x tile"""
+    variants = {}
+    for name, image in photos.items():
+        for width in widths:
+            height = int(round(image.shape[0] * width / image.shape[1]))
+            variants[f"{name}@{width}"] = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    if tile > 1:
+        # Mosaico com as fotos alternadas, na maior largura pedida
+        cells = [cv2.resize(image, (max(widths) // tile, max(widths) // tile)) for image in photos.values()]
+        rows = [np.hstack([cells[(r + c) % len(cells)] for c in range(tile)]) for r in range(tile)]
+        variants[f"mosaico{tile}x{tile}@{max(widths)}"] = np.vstack(rows)
+    return variants
+
+
+def measure(fn, repeat, warmup=1):
+    """Executa fn `warmup` + `repeat` vezes e resume os tempos (ms) das execuções medidas"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return {"median_ms": statistics.median(times), "min_ms": min(times),
+            "mean_ms": statistics.fmean(times), "runs": repeat}
+
+
+class StageBench:
+    """Coleta os tempos por nome ("estágio/variante"); estágios sem dependência são marcados como pulados"""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+
+    def run(self, name, fn, repeat=None, **extra):
+        try:
+            result = measure(fn, repeat or self.repeat)
+        except Exception as exc:
+            result = {"skipped": f"{exc.__class__.__name__}: {exc}"}
+        result.update(extra)
+        self.results[name] = result
+        if "skipped" in result:
+            print(f"{name:40s} pulado ({result['skipped']})")
+        else:
+            print(f"{name:40s} {result['median_ms']:10.2f} ms  (mín {result['min_ms']:.2f})")
+        return result
+
+    def skip(self, name, reason):
+        self.results[name] = {"skipped": reason}
+        print(f"{name:40s} pulado ({reason})")
+
+
+def bench_load(bench, variants, tmpdir):
+    """Decodificação de JPEG com OpenCV e com o PIL (caminho do face_recognition.load_image_file)"""
+    from PIL import Image
+
+    for name, image in variants.items():
+        path = os.path.join(tmpdir, name.replace("@", "_") + ".jpg")
+        cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        bench.run(f"load/cv2/{name}", lambda: cv2.imread(path))
+        bench.run(f"load/pil/{name}", lambda: np.asarray(Image.open(path).convert("RGB")))
+
+
+def bench_detect(bench, rgb_variants, detectors):
+    from detectors import get_detector
+
+    found = {}
+    for backend in detectors:
+        try:
+            detector = get_detector(backend)
+        except Exception as exc:
+            bench.skip(f"detect/{backend}", f"{exc.__class__.__name__}: {exc}")
+            continue
+        # O CNN em CPU é muito lento: menos repetições
+        repeat = max(1, bench.repeat // 5) if backend == "cnn" else None
+        for name, rgb in rgb_variants.items():
+            result = bench.run(f"detect/{backend}/{name}", lambda: detector(rgb), repeat=repeat)
+            if "skipped" not in result:
+                locations = detector(rgb)
+                result["faces"] = len(locations)
+                found.setdefault(name, locations)
+    return found
+
+
+def bench_landmarks(bench, rgb_variants, locations):
+    import face_recognition
+
+    for name, rgb in rgb_variants.items():
+        locs = locations.get(name)
+        if not locs:
+            bench.skip(f"landmarks/{name}", "nenhum rosto detectado")
+            continue
+        for model in ("large", "small"):
+            bench.run(f"landmarks/{model}/{name}",
+                      lambda: face_recognition.face_landmarks(rgb, locs, model=model), faces=len(locs))
+
+
+def bench_encode(bench, rgb_variants, locations, jitters):
+    import face_recognition
+
+    for name, rgb in rgb_variants.items():
+        locs = locations.get(name)
+        if not locs:
+            bench.skip(f"encode/{name}", "nenhum rosto detectado")
+            continue
+        for num_jitters in jitters:
+            bench.run(f"encode/jitter{num_jitters}/{name}",
+                      lambda: face_recognition.face_encodings(rgb, locs, num_jitters=num_jitters), faces=len(locs))
+
+
+def bench_analyze(bench, rgb_variants):
+    """Landmarks + encodings pelas chamadas separadas da biblioteca contra uma única passada (analysis.analyze)"""
+    import face_recognition
+    from analysis import analyze
+    from detectors import get_detector
+
+    detector = get_detector("hog")
+    for name, rgb in rgb_variants.items():
+        bench.run(f"analyze/separado/{name}",
+                  lambda: (face_recognition.face_landmarks(rgb), face_recognition.face_encodings(rgb)))
+        bench.run(f"analyze/uma_passada/{name}", lambda: analyze(rgb, detector, landmarks="large"))
+
+
+def bench_match(bench, sizes, faces_per_frame):
+    """Busca exata na galeria (FaceGallery.nearest) para galerias sintéticas de vários tamanhos"""
+    rng = np.random.default_rng(0)
+    queries = rng.normal(scale=0.1, size=(faces_per_frame, ENCODING_DIM)).astype(np.float32)
+    for size in sizes:
+        encodings = rng.normal(scale=0.1, size=(size, ENCODING_DIM)).astype(np.float32)
+        gallery = FaceGallery(encodings, [f"id{i}" for i in range(size)])
+        del encodings
+        bench.run(f"match/{size}", lambda: gallery.nearest(queries), faces=faces_per_frame)
+        del gallery
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold, min_delta_ms=0.05):
+    """Compara as medianas com as do baseline; retorna os nomes que ficaram mais lentos que o limite
+
+    Diferenças menores que `min_delta_ms` são ruído de medição e não contam como regressão.
+    """
+    regressions = []
+    print(f"\n{'estágio':40s} {'base':>10s} {'atual':>10s} {'razão':>7s}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or "median_ms" not in base or "median_ms" not in result:
+            continue
+        ratio = result["median_ms"] / max(base["median_ms"], 1e-9)
+        significant = abs(result["median_ms"] - base["median_ms"]) >= min_delta_ms
+        flag = ""
+        if significant and ratio > 1.0 + threshold:
+            flag = "  REGRESSÃO"
+            regressions.append(name)
+        elif significant and ratio < 1.0 - threshold:
+            flag = "  melhora"
+        print(f"{name:40s} {base['median_ms']:10.2f} {result['median_ms']:10.2f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--widths", type=int, nargs="+", default=[320, 640, 1280])
+    parser.add_argument("--tile", type=int, default=2, help="mosaico tile x tile (0 = sem mosaico)")
+    parser.add_argument("--detectors", nargs="+", default=["hog", "cnn", "ssd"])
+    parser.add_argument("--jitters", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--gallery-sizes", type=int, nargs="+",
+                        default=[10, 100, 1000, 10000, 100000, 1000000])
+    parser.add_argument("--faces", type=int, default=4, help="rostos por consulta na busca")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="grava os resultados neste JSON")
+    parser.add_argument("--compare", help="JSON de referência para apontar regressões")
+    parser.add_argument("--threshold", type=float, default=0.1, help="piora relativa tolerada")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="diferença absoluta mínima para contar")
+    args = parser.parse_args()
+
+    variants = make_variants(load_photos(), args.widths, args.tile)
+    rgb_variants = {name: cv2.cvtColor(image, cv2.COLOR_BGR2RGB) for name, image in variants.items()}
+    bench = StageBench(args.repeat)
+
+    if "load" in args.stages:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bench_load(bench, variants, tmpdir)
+
+    locations = {}
+    if {"detect", "landmarks", "encode"} & set(args.stages):
+        detectors = args.detectors if "detect" in args.stages else args.detectors[:1]
+        locations = bench_detect(bench, rgb_variants, detectors)
+
+    for stage, fn in (("landmarks", lambda: bench_landmarks(bench, rgb_variants, locations)),
+                      ("encode", lambda: bench_encode(bench, rgb_variants, locations, args.jitters)),
+                      ("analyze", lambda: bench_analyze(bench, rgb_variants))):
+        if stage in args.stages:
+            try:
+                fn()
+            except ImportError as exc:
+                bench.skip(stage, f"{exc.__class__.__name__}: {exc}")
+
+    if "match" in args.stages:
+        bench_match(bench, args.gallery_sizes, args.faces)
+
+    report = {"environment": environment(), "args": vars(args), "results": bench.results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(bench.results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regressões acima de {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
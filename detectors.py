@@ -0,0 +1,105 @@
+import os
+
+import cv2
+
+# Backend de detecção escolhido por configuração (variável de ambiente FACE_DETECTOR); cada app
+# pode ter o seu padrão para quando a variável não está definida
+DEFAULT_BACKEND = "hog"
+
+
+class FaceDetector:
+    """Interface comum dos detectores
+
+    `detect(rgb_frame)` retorna caixas (top, right, bottom, left) em pixels do frame recebido,
+    prontas para `face_recognition.face_encodings(rgb_frame, known_face_locations=...)`.
+    Assim a detecção é feita uma única vez por frame.
+    """
+
+    name = None
+
+    def detect(self, rgb_frame):
+        raise NotImplementedError
+
+    def detect_batch(self, rgb_frames):
+        return [self.detect(frame) for frame in rgb_frames]
+
+    def detect_with_confidence(self, rgb_frame):
+        """(caixas, confianças); backends sem pontuação devolvem None para cada caixa"""
+        locations = self.detect(rgb_frame)
+        return locations, [None] * len(locations)
+
+    def __call__(self, rgb_frame):
+        return self.detect(rgb_frame)
+
+
+class HOGDetector(FaceDetector):
+    """HOG + SVM do dlib (CPU, padrão do face_recognition)"""
+
+    name = "hog"
+
+    def __init__(self, upsample=1):
+        self.upsample = upsample
+
+    def detect(self, rgb_frame):
+        import face_recognition
+        return face_recognition.face_locations(rgb_frame, self.upsample, model="hog")
+
+
+class CNNDetector(FaceDetector):
+    """CNN (MMOD) do dlib; mais preciso, lento em CPU, aceita lotes"""
+
+    name = "cnn"
+
+    def __init__(self, upsample=1, batch_size=32):
+        self.upsample = upsample
+        self.batch_size = batch_size
+
+    def detect(self, rgb_frame):
+        import face_recognition
+        return face_recognition.face_locations(rgb_frame, self.upsample, model="cnn")
+
+    def detect_batch(self, rgb_frames):
+        import face_recognition
+        # batch_face_locations exige frames do mesmo tamanho
+        if len({frame.shape for frame in rgb_frames}) > 1:
+            return super().detect_batch(rgb_frames)
+        return face_recognition.batch_face_locations(list(rgb_frames), self.upsample, self.batch_size)
+
+
+class SSDFaceDetector(FaceDetector):
+    """SSD (ResNet-10) do OpenCV DNN"""
+
+    name = "ssd"
+
+    def __init__(self, confidence=0.5, nms_threshold=0.4):
+        from ssd_detector import SSDDetector
+        self.ssd = SSDDetector(confidence=confidence, nms_threshold=nms_threshold)
+
+    def detect(self, rgb_frame):
+        return self.detect_batch([rgb_frame])[0]
+
+    def detect_batch(self, rgb_frames):
+        from ssd_detector import to_locations
+        # O modelo foi treinado com imagens BGR
+        bgr_frames = [cv2.cvtColor(frame, cv2.COLOR_RGB2BGR) for frame in rgb_frames]
+        return [to_locations(boxes) for boxes, _ in self.ssd.detect_batch(bgr_frames)]
+
+    def detect_with_confidence(self, rgb_frame):
+        from ssd_detector import to_locations
+        boxes, confidences = self.ssd.detect(cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR))
+        return to_locations(boxes), [float(c) for c in confidences]
+
+
+BACKENDS = {
+    HOGDetector.name: HOGDetector,
+    CNNDetector.name: CNNDetector,
+    SSDFaceDetector.name: SSDFaceDetector,
+}
+
+
+def get_detector(backend=None, default=DEFAULT_BACKEND, **kwargs):
+    """Cria o detector pelo nome ('hog', 'cnn' ou 'ssd'); sem nome, usa FACE_DETECTOR ou `default`"""
+    backend = (backend or os.environ.get("FACE_DETECTOR") or default).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"detector desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+    return BACKENDS[backend](**kwargs)
@@ -0,0 +1,143 @@
+import collections
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+
+
+class EncodingCache:
+    """Cache de resultados de detecção/encoding endereçado pelo conteúdo da imagem
+
+    A chave é o hash do conteúdo mais os parâmetros (detector, modelo, upsample...), então a
+    mesma imagem com outros parâmetros é outra entrada. Camadas:
+    - memória: LRU com no máximo `max_items` entradas
+    - disco (opcional, `disk_path`): um arquivo por entrada, removendo as menos usadas
+      quando o total passa de `max_disk_bytes`
+    """
+
+    def __init__(self, max_items=1024, disk_path=None, max_disk_bytes=512 * 1024 * 1024):
+        self.max_items = max_items
+        self.disk_path = disk_path
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        if disk_path:
+            os.makedirs(disk_path, exist_ok=True)
+            self._disk_bytes = sum(os.path.getsize(path) for path in self._disk_files())
+
+    @staticmethod
+    def key(data, **params):
+        """Hash do conteúdo + parâmetros"""
+        digest = hashlib.sha256(data).hexdigest()
+        if params:
+            digest += "-" + hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+        return digest
+
+    def get(self, key):
+        """Retorna o valor em cache, ou None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._memory_put(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def get_or_compute(self, data, compute, **params):
+        """Retorna o resultado em cache para estes bytes e parâmetros, ou calcula com `compute()`"""
+        key = self.key(data, **params)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _memory_put(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _disk_file(self, key):
+        return os.path.join(self.disk_path, key[:2], key + ".pkl")
+
+    def _disk_files(self):
+        for dirpath, _, filenames in os.walk(self.disk_path):
+            for filename in filenames:
+                if filename.endswith(".pkl"):
+                    yield os.path.join(dirpath, filename)
+
+    def _disk_get(self, key):
+        if not self.disk_path:
+            return None
+        path = self._disk_file(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        # Atualiza o horário de acesso usado na remoção das entradas menos usadas
+        os.utime(path)
+        return value
+
+    def _disk_put(self, key, value):
+        if not self.disk_path:
+            return
+        path = self._disk_file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Grava num temporário e renomeia, para nunca deixar uma entrada pela metade
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._disk_bytes += os.path.getsize(path) - previous
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._evict()
+
+    def _evict(self):
+        """Remove as entradas de disco menos usadas até ficar em 90% do limite"""
+        files = sorted(self._disk_files(), key=os.path.getmtime)
+        with self._lock:
+            for path in files:
+                if self._disk_bytes <= self.max_disk_bytes * 0.9:
+                    break
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._disk_bytes -= size
+
+    def stats(self):
+        total = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / total if total else 0.0,
+            "memory_items": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
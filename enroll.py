@@ -0,0 +1,164 @@
+"""Cadastro em massa de rostos a partir de um diretório de fotos
+
+Cada foto deve conter exatamente um rosto. O nome da pessoa vem do diretório da foto
+(fotos/maria/1.jpg -> "maria") ou do nome do arquivo (--name-from file).
+
+Uso: python enroll.py fotos/ --store known_faces --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from face_store import DEFAULT_STORE_PATH, FaceStore
+from inference_pool import encode_image_bytes, init_worker
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif"}
+REJECTS_FILE = "enroll_rejects.jsonl"
+
+
+def find_images(root):
+    """Percorre o diretório em ordem estável, para que uma retomada veja os arquivos na mesma ordem"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                yield os.path.join(dirpath, filename)
+
+
+def person_name(path, name_from):
+    if name_from == "file":
+        return os.path.splitext(os.path.basename(path))[0]
+    return os.path.basename(os.path.dirname(path))
+
+
+def encode_file(data, model, upsample):
+    """Executado nos workers; erros de decodificação viram rejeição em vez de derrubar o lote"""
+    try:
+        return encode_image_bytes(data, model, upsample)
+    except Exception as exc:
+        return f"{type(exc).__name__}: {exc}"
+
+
+class Enrollment:
+    """Estado de uma execução: o que já foi processado, lote pendente e estatísticas"""
+
+    def __init__(self, store, batch_size, largest):
+        self.store = store
+        self.batch_size = batch_size
+        self.largest = largest
+        self.rejects_path = os.path.join(store.path, REJECTS_FILE)
+
+        self.done = self._processed_hashes()
+        self.encodings, self.records, self.rejects = [], [], []
+        self.enrolled = self.rejected = self.skipped = 0
+
+    def _processed_hashes(self):
+        """Hashes já cadastrados ou rejeitados em execuções anteriores (checkpoint)"""
+        done = set()
+        if self.store.exists():
+            _, records = self.store.load()
+            done.update(r["sha256"] for r in records if "sha256" in r)
+        if os.path.exists(self.rejects_path):
+            with open(self.rejects_path, encoding="utf-8") as f:
+                done.update(json.loads(line)["sha256"] for line in f if line.strip())
+        return done
+
+    def add_result(self, path, name, digest, result):
+        if isinstance(result, str):
+            return self._reject(path, digest, result)
+        locations, encodings = result
+        if len(encodings) == 0:
+            return self._reject(path, digest, "nenhum rosto")
+        if len(encodings) > 1 and not self.largest:
+            return self._reject(path, digest, f"{len(encodings)} rostos")
+
+        # Com --largest, fica com o maior rosto da foto
+        areas = (locations[:, 1] - locations[:, 3]) * (locations[:, 2] - locations[:, 0])
+        self.encodings.append(encodings[areas.argmax()])
+        self.records.append({"name": name, "source": path, "sha256": digest})
+        self.enrolled += 1
+        if len(self.records) >= self.batch_size:
+            self.flush()
+
+    def _reject(self, path, digest, reason):
+        self.rejects.append({"source": path, "sha256": digest, "reason": reason})
+        self.rejected += 1
+        if len(self.rejects) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Grava o lote pendente; o checkpoint é a própria galeria mais o arquivo de rejeitados"""
+        if self.records:
+            self.store.append_many(self.encodings, self.records)
+            self.encodings, self.records = [], []
+        if self.rejects:
+            self.store.create()
+            with open(self.rejects_path, "a", encoding="utf-8") as f:
+                for reject in self.rejects:
+                    f.write(json.dumps(reject, ensure_ascii=False) + "\n")
+                    print(f"  rejeitado: {reject['source']} ({reject['reason']})")
+            self.rejects = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch", type=int, default=256, help="fotos por gravação na galeria")
+    parser.add_argument("--name-from", choices=["dir", "file"], default="dir")
+    parser.add_argument("--model", choices=["hog", "cnn"], default="hog")
+    parser.add_argument("--upsample", type=int, default=1)
+    parser.add_argument("--largest", action="store_true", help="aceita fotos com vários rostos usando o maior")
+    args = parser.parse_args()
+
+    enrollment = Enrollment(FaceStore(args.store), args.batch, args.largest)
+    max_in_flight = args.workers * 4
+    start = last_report = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as executor:
+        in_flight = []
+
+        def collect(block):
+            # Consome os resultados na ordem de envio
+            while in_flight and (block or in_flight[0][3].done()):
+                path, name, digest, future = in_flight.pop(0)
+                enrollment.add_result(path, name, digest, future.result())
+
+        for path in find_images(args.directory):
+            with open(path, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            if digest in enrollment.done:
+                enrollment.skipped += 1
+                continue
+            enrollment.done.add(digest)
+
+            future = executor.submit(encode_file, data, args.model, args.upsample)
+            in_flight.append((path, person_name(path, args.name_from), digest, future))
+            if len(in_flight) >= max_in_flight:
+                in_flight[0][3].result()
+            collect(block=False)
+
+            now = time.perf_counter()
+            if now - last_report > 5.0:
+                processed = enrollment.enrolled + enrollment.rejected
+                print(f"{processed} fotos, {processed / (now - start):.1f} fotos/s")
+                last_report = now
+        collect(block=True)
+
+    enrollment.flush()
+    elapsed = time.perf_counter() - start
+    processed = enrollment.enrolled + enrollment.rejected
+    print(f"cadastrados: {enrollment.enrolled}, rejeitados: {enrollment.rejected}, "
+          f"já processados: {enrollment.skipped}")
+    print(f"{processed} fotos em {elapsed:.1f}s ({processed / elapsed if elapsed else 0.0:.1f} fotos/s)")
+    if enrollment.rejected:
+        print(f"lista de rejeitados: {enrollment.rejects_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from gallery import ENCODING_DIM, FaceGallery
+
+# Diretório padrão da galeria (substitui o antigo known_faces.pkl)
+DEFAULT_STORE_PATH = "known_faces"
+LEGACY_PICKLE_PATH = "known_faces.pkl"
+
+# Representação da galeria em memória: vazio = float32; "float16" ou "int8" usam a
+# QuantizedGallery, com reordenação dos candidatos em precisão total a partir do arquivo
+GALLERY_QUANTIZATION = os.environ.get("FACE_GALLERY_QUANT", "")
+
+ENCODINGS_FILE = "encodings.npy"
+RECORDS_FILE = "names.jsonl"
+
+# Cabeçalho .npy de tamanho fixo, para que o shape possa ser reescrito no lugar a cada inclusão
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+_HEADER_SIZE = 128
+_ROW_BYTES = ENCODING_DIM * np.dtype("<f4").itemsize
+
+
+def _npy_header(rows):
+    """Monta o cabeçalho .npy (versão 1.0) com exatamente _HEADER_SIZE bytes"""
+    header = "{'descr': '<f4', 'fortran_order': False, 'shape': (%d, %d), }" % (rows, ENCODING_DIM)
+    header_len = _HEADER_SIZE - len(_NPY_MAGIC) - 2
+    header = header.ljust(header_len - 1) + "\n"
+    return _NPY_MAGIC + header_len.to_bytes(2, "little") + header.encode("latin1")
+
+
+class FaceStore:
+    """Galeria persistente: encodings em .npy mapeado em memória + nomes/metadados em .jsonl
+
+    Cada cadastro acrescenta uma linha nos dois arquivos, sem reescrever a galeria inteira.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self.encodings_path = os.path.join(path, ENCODINGS_FILE)
+        self.records_path = os.path.join(path, RECORDS_FILE)
+        self._repaired = False
+
+    def exists(self):
+        return os.path.exists(self.encodings_path) and os.path.exists(self.records_path)
+
+    def create(self):
+        """Cria uma galeria vazia (não faz nada se já existir)"""
+        if self.exists():
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.encodings_path, "wb") as f:
+            f.write(_npy_header(0))
+        open(self.records_path, "w", encoding="utf-8").close()
+
+    def version(self):
+        """Identifica o estado atual da galeria; muda a cada inclusão"""
+        if not self.exists():
+            return None
+        stat = os.stat(self.encodings_path)
+        return stat.st_mtime_ns, stat.st_size, os.stat(self.records_path).st_size
+
+    def _read_records(self):
+        with open(self.records_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _header_rows(self):
+        with open(self.encodings_path, "rb") as f:
+            header = f.read(_HEADER_SIZE)
+        shape = header[header.index(b"(") + 1:header.index(b")")]
+        return int(shape.split(b",")[0])
+
+    def _consistent_rows(self, records):
+        """Número de linhas completas: presentes nos dados, no cabeçalho e nos metadados"""
+        file_rows = (os.path.getsize(self.encodings_path) - _HEADER_SIZE) // _ROW_BYTES
+        return min(file_rows, self._header_rows(), len(records))
+
+    def _repair(self):
+        """Descarta registros incompletos deixados por uma inclusão interrompida (só quem escreve)"""
+        records = self._read_records()
+        rows = self._consistent_rows(records)
+
+        file_rows = (os.path.getsize(self.encodings_path) - _HEADER_SIZE) // _ROW_BYTES
+        if file_rows != rows or self._header_rows() != rows:
+            with open(self.encodings_path, "r+b") as f:
+                f.truncate(_HEADER_SIZE + rows * _ROW_BYTES)
+                f.seek(0)
+                f.write(_npy_header(rows))
+        if len(records) != rows:
+            with open(self.records_path, "w", encoding="utf-8") as f:
+                for record in records[:rows]:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._repaired = True
+
+    def load(self):
+        """Retorna (encodings, registros); os encodings são um memmap somente leitura
+
+        Não altera os arquivos, então pode ser usado enquanto outro processo inclui rostos.
+        """
+        records = self._read_records()
+        rows = self._consistent_rows(records)
+        if rows == 0:
+            return np.empty((0, ENCODING_DIM), dtype=np.float32), []
+        encodings = np.load(self.encodings_path, mmap_mode="r")
+        return encodings[:rows], records[:rows]
+
+    def load_gallery(self, quantization=GALLERY_QUANTIZATION, rerank=10):
+        """Carrega a galeria pronta para busca (FaceGallery, ou QuantizedGallery com `quantization`)"""
+        if not self.exists():
+            return FaceGallery()
+        encodings, records = self.load()
+        names = [r["name"] for r in records]
+        if quantization:
+            from quantized import QuantizedGallery
+            # O memmap fica como fonte da precisão total: só as linhas candidatas são lidas do disco
+            return QuantizedGallery(encodings, names, quantization, rerank=rerank, full=encodings)
+        return FaceGallery(encodings, names)
+
+    def append(self, encoding, name, **metadata):
+        """Acrescenta um rosto à galeria"""
+        self.append_many([encoding], [dict(metadata, name=name)])
+
+    def append_many(self, encodings, records):
+        """Acrescenta vários rostos; cada registro é um dict com pelo menos a chave 'name'"""
+        encodings = np.asarray(encodings, dtype="<f4").reshape(-1, ENCODING_DIM)
+        if len(records) != len(encodings):
+            raise ValueError("encodings e records devem ter o mesmo tamanho")
+        if len(encodings) == 0:
+            return
+
+        self.create()
+        if not self._repaired:
+            self._repair()
+        rows = self._header_rows()
+        now = time.time()
+
+        # Ordem: dados, metadados e por último o cabeçalho, para que uma falha no meio
+        # seja descartada por _repair na próxima leitura
+        with open(self.encodings_path, "r+b") as f:
+            f.seek(_HEADER_SIZE + rows * _ROW_BYTES)
+            f.write(encodings.tobytes())
+        with open(self.records_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(dict({"added": now}, **record), ensure_ascii=False) + "\n")
+        with open(self.encodings_path, "r+b") as f:
+            f.write(_npy_header(rows + len(encodings)))
+
+
+class StoreWatcher:
+    """Mantém um FaceGallery carregado e o substitui quando a galeria em disco muda
+
+    Uma thread verifica `store.version()` a cada `interval` segundos; a nova galeria é montada
+    por inteiro antes de trocar a referência, então quem lê `watcher.gallery` nunca vê uma
+    galeria pela metade.
+    """
+
+    def __init__(self, store, interval=2.0):
+        self.store = store
+        self.interval = interval
+        self.gallery = FaceGallery()
+        self.loaded_version = None
+        self.reloads = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def reload(self):
+        """Recarrega se a versão mudou; retorna True se trocou a galeria"""
+        version = self.store.version()
+        if version == self.loaded_version:
+            return False
+        gallery = self.store.load_gallery()
+        self.gallery, self.loaded_version = gallery, version
+        self.reloads += 1
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reload()
+            except (OSError, ValueError) as exc:
+                # Arquivo sendo escrito ou removido; tenta de novo no próximo ciclo
+                print(f"Falha ao recarregar {self.store.path}: {exc}")
+
+    def start(self):
+        self.reload()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1.0)
+
+
+def migrate_pickle(pickle_path=LEGACY_PICKLE_PATH, store_path=DEFAULT_STORE_PATH):
+    """Converte o antigo known_faces.pkl para o formato FaceStore (uma única vez)"""
+    store = FaceStore(store_path)
+    if store.exists():
+        return store
+
+    with open(pickle_path, "rb") as f:
+        data = pickle.load(f)
+
+    # Monta a galeria num diretório temporário e só a coloca no lugar quando está completa: uma
+    # falha no meio não deixa uma galeria vazia que open_store tomaria por já migrada
+    tmp_path = f"{store_path}.migrando-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    try:
+        tmp = FaceStore(tmp_path)
+        tmp.create()
+        tmp.append_many(data["encodings"], [{"name": name, "source": pickle_path} for name in data["names"]])
+        try:
+            os.replace(tmp_path, store_path)
+        except OSError:
+            # Outro processo migrou ao mesmo tempo
+            if not store.exists():
+                raise
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return store
+
+
+def open_store(store_path=DEFAULT_STORE_PATH, pickle_path=LEGACY_PICKLE_PATH):
+    """Abre a galeria, migrando o known_faces.pkl na primeira execução se necessário"""
+    store = FaceStore(store_path)
+    if not store.exists() and os.path.exists(pickle_path):
+        return migrate_pickle(pickle_path, store_path)
+    return store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migra o known_faces.pkl para o formato FaceStore")
+    parser.add_argument("--pickle", default=LEGACY_PICKLE_PATH)
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    args = parser.parse_args()
+
+    store = migrate_pickle(args.pickle, args.store)
+    encodings, records = store.load()
+    print(f"{len(records)} rosto(s) em {store.path}")
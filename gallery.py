@@ -0,0 +1,118 @@
+import numpy as np
+
+# Dimensão dos encodings gerados pelo face_recognition (dlib)
+ENCODING_DIM = 128
+
+# Tolerância padrão usada pelo face_recognition.compare_faces
+DEFAULT_TOLERANCE = 0.6
+
+
+class FaceGallery:
+    """Galeria de rostos conhecidos em uma matriz float32 contígua (N x 128)"""
+
+    def __init__(self, encodings=None, names=None, capacity=64):
+        self._size = 0
+        self._encodings = np.empty((max(capacity, 1), ENCODING_DIM), dtype=np.float32)
+        self._sq_norms = np.empty(max(capacity, 1), dtype=np.float32)
+        self._names = np.empty(max(capacity, 1), dtype=object)
+
+        if encodings is not None and len(encodings) > 0:
+            self.extend(encodings, names)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def encodings(self):
+        """Visão (sem cópia) dos encodings cadastrados"""
+        return self._encodings[:self._size]
+
+    @property
+    def names(self):
+        """Visão (sem cópia) dos nomes, paralela aos encodings"""
+        return self._names[:self._size]
+
+    def _reserve(self, extra):
+        """Garante espaço para mais `extra` linhas, crescendo a capacidade geometricamente"""
+        needed = self._size + extra
+        capacity = self._encodings.shape[0]
+        if needed <= capacity:
+            return
+
+        while capacity < needed:
+            capacity *= 2
+
+        encodings = np.empty((capacity, ENCODING_DIM), dtype=np.float32)
+        encodings[:self._size] = self._encodings[:self._size]
+        sq_norms = np.empty(capacity, dtype=np.float32)
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        names = np.empty(capacity, dtype=object)
+        names[:self._size] = self._names[:self._size]
+
+        self._encodings, self._sq_norms, self._names = encodings, sq_norms, names
+
+    def add(self, encoding, name):
+        """Cadastra um único rosto"""
+        self.extend([encoding], [name])
+
+    def extend(self, encodings, names):
+        """Cadastra vários rostos de uma vez"""
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if len(names) != len(encodings):
+            raise ValueError("encodings e names devem ter o mesmo tamanho")
+
+        self._reserve(len(encodings))
+        start, end = self._size, self._size + len(encodings)
+        self._encodings[start:end] = encodings
+        self._sq_norms[start:end] = np.einsum("ij,ij->i", encodings, encodings)
+        self._names[start:end] = list(names)
+        self._size = end
+
+    def distances(self, face_encodings):
+        """Matriz de distâncias euclidianas (M x N) entre os rostos do frame e a galeria"""
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        # Lê o tamanho antes dos arrays: um add() concorrente só aumenta a capacidade antes do tamanho
+        size = self._size
+        encodings, sq_norms = self._encodings, self._sq_norms
+        if size == 0 or len(queries) == 0:
+            return np.empty((len(queries), size), dtype=np.float32)
+
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab, calculado para todos os pares em uma única multiplicação
+        q_sq = np.einsum("ij,ij->i", queries, queries)
+        sq = q_sq[:, None] + sq_norms[None, :size] - 2.0 * (queries @ encodings[:size].T)
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq, out=sq)
+
+    def nearest(self, face_encodings, tolerance=DEFAULT_TOLERANCE, unknown=None):
+        """Retorna (nomes, distâncias) do vizinho mais próximo de cada rosto
+
+        Rostos cuja menor distância passa da tolerância recebem `unknown`.
+        """
+        dists = self.distances(face_encodings)
+        if dists.shape[0] == 0:
+            return [], np.empty(0, dtype=np.float32)
+        if dists.shape[1] == 0:
+            return [unknown] * dists.shape[0], np.full(dists.shape[0], np.inf, dtype=np.float32)
+
+        idx = np.argmin(dists, axis=1)
+        best = dists[np.arange(len(idx)), idx]
+        names = [self._names[i] if d <= tolerance else unknown for i, d in zip(idx, best)]
+        return names, best
+
+    def top_k(self, face_encodings, k=5):
+        """Retorna (índices, distâncias) dos k vizinhos mais próximos de cada rosto, ordenados"""
+        dists = self.distances(face_encodings)
+        size = dists.shape[1]
+        k = min(k, size)
+        if k == 0:
+            shape = (dists.shape[0], 0)
+            return np.empty(shape, dtype=np.int64), np.empty(shape, dtype=np.float32)
+
+        # argpartition evita ordenar a galeria inteira
+        if k < size:
+            idx = np.argpartition(dists, k - 1, axis=1)[:, :k]
+        else:
+            idx = np.tile(np.arange(size), (dists.shape[0], 1))
+        part = np.take_along_axis(dists, idx, axis=1)
+        order = np.argsort(part, axis=1)
+        return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
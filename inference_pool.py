@@ -0,0 +1,121 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Configuração padrão do pool (sobrescrita por variáveis de ambiente)
+DEFAULT_WORKERS = int(os.environ.get("FACE_POOL_WORKERS", os.cpu_count() or 1))
+DEFAULT_MAX_PENDING = int(os.environ.get("FACE_POOL_MAX_PENDING", 4 * DEFAULT_WORKERS))
+DEFAULT_TIMEOUT = float(os.environ.get("FACE_REQUEST_TIMEOUT", 30.0))
+
+
+class PoolBusy(Exception):
+    """O pool já tem o número máximo de tarefas pendentes"""
+
+
+def init_worker():
+    """Executado uma vez em cada processo: carrega os modelos do dlib e faz uma inferência de aquecimento"""
+    from startup import warm_up
+
+    warm_up()
+
+
+def _ping():
+    return os.getpid()
+
+
+def encode_image_bytes(data, model="hog", upsample=1):
+    """Decodifica a imagem e retorna (caixas, encodings) como arrays NumPy
+
+    A detecção roda numa cópia reduzida e o encoding em recortes da resolução total (ingest.py).
+    """
+    from ingest import encode_bytes
+
+    return encode_bytes(data, model, upsample)
+
+
+def detect_encode_image_bytes(data, encoded_boxes, reencode_iou=0.6, model="hog", upsample=1):
+    """Frames do /stream: (caixas, índices, encodings) com só os rostos novos ou que mudaram codificados"""
+    from ingest import detect_encode_bytes
+
+    return detect_encode_bytes(data, encoded_boxes, reencode_iou, model, upsample)
+
+
+def encode_image_regions(data, locations):
+    """Encodings (N, 128) apenas das caixas pedidas (tracks do /stream que detect_encode_image_bytes não cobriu)"""
+    from ingest import encode_locations_bytes
+
+    return encode_locations_bytes(data, locations)
+
+
+def encode_image_batch(datas, model="hog", upsample=1):
+    """Versão em lote de encode_image_bytes; imagens inválidas retornam a mensagem de erro"""
+    results = []
+    for data in datas:
+        try:
+            results.append(encode_image_bytes(data, model, upsample))
+        except Exception as exc:
+            results.append(f"{type(exc).__name__}: {exc}")
+    return results
+
+
+class InferencePool:
+    """Pool de processos pré-aquecidos para o trabalho de CPU (decodificação, detecção, encoding)
+
+    Usado a partir do event loop: `await pool.run(fn, *args)`. Rejeita com PoolBusy quando há
+    `max_pending` tarefas em andamento e com asyncio.TimeoutError após `timeout` segundos.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING, timeout=DEFAULT_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.executor = None
+        self._warming = []
+        self._lock = threading.Lock()
+
+    def start(self, wait=True):
+        """Cria os processos e dispara o aquecimento de todos
+
+        Com `wait=False` retorna logo: as requisições que chegarem antes do fim do aquecimento
+        só esperam na fila do executor, e `ready` indica quando todos os workers estão prontos.
+        """
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+        # Uma tarefa por worker força a criação (e o aquecimento) de todos os processos agora
+        self._warming = [self.executor.submit(_ping) for _ in range(self.workers)]
+        if wait:
+            for future in self._warming:
+                future.result()
+        return self
+
+    @property
+    def ready(self):
+        return self.executor is not None and all(f.done() and not f.exception() for f in self._warming)
+
+    def wait_ready(self, timeout=None):
+        for future in self._warming:
+            future.result(timeout)
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def run(self, fn, *args, timeout=None):
+        """Executa `fn(*args)` num worker; `timeout` (padrão: self.timeout) vale para a tarefa toda"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise PoolBusy(f"{self.pending} tarefas pendentes")
+            self.pending += 1
+        future = self.executor.submit(fn, *args)
+        # A vaga só é liberada quando o worker termina (ou a tarefa é cancelada antes de começar):
+        # depois de um timeout a tarefa continua ocupando o worker e precisa continuar contando
+        future.add_done_callback(self._release)
+        # Em caso de timeout a resposta é liberada na hora; o worker termina a tarefa e é reaproveitado
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+
+    def _release(self, future):
+        # Chamado na thread do executor
+        with self._lock:
+            self.pending -= 1
@@ -0,0 +1,172 @@
+"""Entrada de imagens enviadas: detecção em tamanho reduzido, encoding a partir da resolução total
+
+`face_recognition.load_image_file` decodifica tudo em resolução total (uma foto de 12 MP
+ocupa ~36 MB só no array) e o HOG varre a imagem inteira. Aqui:
+
+- o cabeçalho é lido antes de decodificar, e imagens acima de MAX_PIXELS são recusadas
+  (ImageTooLarge), o que evita "bombas" de descompressão;
+- a detecção usa uma cópia com no máximo DETECT_MAX_SIDE pixels no lado maior. Em JPEG
+  ela vem direto do decodificador em escala 1/2, 1/4 ou 1/8 (modo draft do PIL), sem passar
+  pela resolução total;
+- as caixas voltam para as coordenadas originais, e só as regiões dos rostos (com margem)
+  são recortadas da imagem em resolução total para o encoding.
+
+    locations, encodings = encode_bytes(data)
+"""
+import io
+import math
+import os
+
+import numpy as np
+from PIL import Image
+
+MAX_PIXELS = int(os.environ.get("FACE_MAX_PIXELS", 50_000_000))
+DETECT_MAX_SIDE = int(os.environ.get("FACE_DETECT_MAX_SIDE", 1280))
+
+# Margem ao redor do rosto no recorte para o encoding (fração do lado da caixa): o shape
+# predictor e o alinhamento do face chip olham um pouco além da caixa detectada
+CROP_MARGIN = 0.5
+
+
+class ImageTooLarge(ValueError):
+    """A imagem tem mais pixels do que MAX_PIXELS"""
+
+
+def open_image(data, max_pixels=MAX_PIXELS):
+    """Abre a imagem sem decodificar os pixels (só o cabeçalho) e aplica o limite de pixels"""
+    image = Image.open(io.BytesIO(data))
+    width, height = image.size
+    if max_pixels and width * height > max_pixels:
+        raise ImageTooLarge(f"imagem de {width}x{height} excede o limite de {max_pixels} pixels")
+    return image
+
+
+def _rgb(image):
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+def detection_image(image, max_side=DETECT_MAX_SIDE):
+    """Array RGB com no máximo `max_side` no lado maior, e a escala (x, y) até o original
+
+    Em JPEG, configura `image` para decodificar em escala reduzida; imagens já pequenas são
+    só decodificadas.
+    """
+    full_size = image.size
+    if max_side and max(full_size) > max_side:
+        ratio = max_side / max(full_size)
+        size = (max(int(full_size[0] * ratio), 1), max(int(full_size[1] * ratio), 1))
+        # Em JPEG, o decodificador entrega direto a maior redução 1/2, 1/4 ou 1/8 que ainda
+        # cobre `size`. Nos outros formatos, reduce (média de blocos inteiros) encolhe a imagem
+        # ainda no PIL, sem copiar a resolução total para numpy; o resize só ajusta o que sobra
+        image.draft("RGB", size)
+        image = _rgb(image)
+        factor = max(image.size) // max_side
+        if factor >= 2:
+            image = image.reduce(factor)
+        small = np.array(image)
+        if small.shape[1::-1] != size:
+            import cv2
+            small = cv2.resize(small, size, interpolation=cv2.INTER_AREA)
+    else:
+        small = np.array(_rgb(image))
+    return small, (full_size[0] / small.shape[1], full_size[1] / small.shape[0])
+
+
+def scale_locations(locations, scale, size):
+    """Caixas (top, right, bottom, left) da imagem reduzida nas coordenadas da original"""
+    sx, sy = scale
+    width, height = size
+    return np.array([(max(int(top * sy), 0), min(int(math.ceil(right * sx)), width),
+                      min(int(math.ceil(bottom * sy)), height), max(int(left * sx), 0))
+                     for top, right, bottom, left in locations], dtype=np.int32).reshape(-1, 4)
+
+
+def face_regions(image, locations, margin=CROP_MARGIN):
+    """Recortes RGB da imagem em resolução total, um por caixa, com a caixa nas coordenadas do recorte
+
+    Só os recortes viram arrays; a imagem inteira fica no buffer do PIL.
+    """
+    image = _rgb(image)
+    width, height = image.size
+    regions = []
+    for top, right, bottom, left in locations:
+        pad = int(margin * max(right - left, bottom - top))
+        x0, y0 = max(left - pad, 0), max(top - pad, 0)
+        x1, y1 = min(right + pad, width), min(bottom + pad, height)
+        crop = np.array(image.crop((x0, y0, x1, y1)))
+        regions.append((crop, (top - y0, right - x0, bottom - y0, left - x0)))
+    return regions
+
+
+def encode_regions(image, locations, num_jitters=1):
+    """Encodings (N, 128) float32 das caixas (coordenadas da imagem em resolução total)"""
+    from analysis import encode_faces
+    from gallery import ENCODING_DIM
+
+    if not len(locations):
+        return np.empty((0, ENCODING_DIM), dtype=np.float32)
+    return np.concatenate([encode_faces(crop, [box], num_jitters)
+                           for crop, box in face_regions(image, locations)]).astype(np.float32, copy=False)
+
+
+def _detect(image, model, upsample, max_side):
+    import face_recognition
+
+    size = image.size
+    small, scale = detection_image(image, max_side)
+    locations = face_recognition.face_locations(small, upsample, model=model)
+    return scale_locations(locations, scale, size), small, scale
+
+
+def detect_bytes(data, model="hog", upsample=1, max_side=DETECT_MAX_SIDE, max_pixels=MAX_PIXELS):
+    """Caixas (N, 4) int32, em coordenadas da imagem original, detectadas na cópia reduzida"""
+    return _detect(open_image(data, max_pixels), model, upsample, max_side)[0]
+
+
+def full_resolution(image, size, data, max_pixels=MAX_PIXELS):
+    """A própria `image` se ela continua em resolução total (PNG, por exemplo, não tem draft);
+    senão (JPEG reduzido na detecção) abre os bytes de novo"""
+    return image if image.size == size else open_image(data, max_pixels)
+
+
+def encode_bytes(data, model="hog", upsample=1, max_side=DETECT_MAX_SIDE, max_pixels=MAX_PIXELS, num_jitters=1):
+    """(caixas, encodings) de uma imagem codificada: detecção reduzida, encoding em resolução total
+
+    Sem rostos, um JPEG nunca é decodificado em resolução total.
+    """
+    image = open_image(data, max_pixels)
+    size = image.size
+    locations, small, scale = _detect(image, model, upsample, max_side)
+    return locations, _encode_detected(image, size, data, small, scale, locations, max_pixels, num_jitters)
+
+
+def _encode_detected(image, size, data, small, scale, locations, max_pixels, num_jitters):
+    from analysis import encode_faces
+
+    if not len(locations):
+        return encode_regions(None, locations)
+    if scale == (1.0, 1.0):
+        # A imagem da detecção já é a original: todos os rostos em uma chamada da rede
+        return encode_faces(small, locations, num_jitters)
+    return encode_regions(full_resolution(image, size, data, max_pixels), locations, num_jitters)
+
+
+def detect_encode_bytes(data, encoded_boxes, reencode_iou=0.6, model="hog", upsample=1, max_side=DETECT_MAX_SIDE,
+                        max_pixels=MAX_PIXELS, num_jitters=1):
+    """(caixas, índices, encodings): detecta e codifica só as caixas que não batem com `encoded_boxes`
+
+    Uma decodificação por frame no /stream; `encoded_boxes` vem de FaceTracker.fresh_boxes.
+    """
+    from tracking import boxes_to_encode
+
+    image = open_image(data, max_pixels)
+    size = image.size
+    locations, small, scale = _detect(image, model, upsample, max_side)
+    indices = boxes_to_encode(locations, encoded_boxes, reencode_iou)
+    return locations, indices, _encode_detected(image, size, data, small, scale, locations[indices], max_pixels,
+                                                num_jitters)
+
+
+def encode_locations_bytes(data, locations, max_pixels=MAX_PIXELS, num_jitters=1):
+    """Encodings em resolução total de caixas já conhecidas (por exemplo, tracks do /stream)"""
+    return encode_regions(open_image(data, max_pixels), locations, num_jitters)
@@ -1,10 +1,15 @@
+from startup import start_warmup, timer
 import tkinter as tk
 from tkinter import messagebox
-from PIL import Image, ImageTk
 import cv2
-import face_recognition
 import numpy as np
 import os
+from analysis import analyze, encode_faces
+from metrics import Metrics, draw_overlay
+from pipeline import FramePipeline
+from scheduler import DetectionScheduler
+from tracking import FaceTracker
+from video_view import VideoView
 
 class FaceRecognitionApp:
     def __init__(self, root):
@@ -12,8 +17,8 @@ class FaceRecognitionApp:
         self.root.title("Face Recognition App - Photo and Video")
         self.root.geometry("800x600")
 
-        # Label para exibir o vídeo ao vivo ou a imagem capturada
-        self.video_frame = tk.Label(self.root)
+        # Área para exibir o vídeo ao vivo ou a imagem capturada
+        self.video_frame = VideoView(self.root, width=640, height=400)
         self.video_frame.pack(pady=20)
         
         # Botões para tirar a foto e iniciar a detecção de rostos
@@ -23,11 +28,23 @@ class FaceRecognitionApp:
         self.btn_start_video = tk.Button(self.root, text="Start Video and Detect Faces", command=self.start_video, state=tk.DISABLED)
         self.btn_start_video.pack(pady=10)
 
+        # Percentis de latência por estágio desenhados sobre o vídeo (opcional)
+        self.show_metrics = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.root, text="Show metrics", variable=self.show_metrics).pack()
+        self.metrics = Metrics()
+        self.encode = self.metrics.wrap("encode", encode_faces)
+        self.match = self.metrics.wrap("match", self.compare_with_photo)
+
         # Variáveis para capturar o vídeo e armazenar a foto tirada
         self.cap = None
+        self.pipeline = None
         self.photo_encoding = None
         self.photo_path = None
 
+        # Os modelos carregam em segundo plano enquanto o usuário tira a foto
+        self.warmup = start_warmup()
+        self.root.after(0, timer.mark, "primeira janela")
+
     def take_photo(self):
         # Abre a webcam e captura a foto
         self.cap = cv2.VideoCapture(0)
@@ -49,11 +66,10 @@ class FaceRecognitionApp:
             # Exibe a foto tirada
             self.show_image(self.photo_path)
 
-            # Faz a codificação do rosto capturado
-            image = face_recognition.load_image_file(self.photo_path)
-            face_encodings = face_recognition.face_encodings(image)
+            # Faz a codificação do rosto capturado (detecção e encoding em uma passada)
+            face_encodings = analyze(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), detector="hog").encodings
 
-            if face_encodings:
+            if len(face_encodings):
                 print(face_encodings[0])
                 self.photo_encoding = face_encodings[0]
                 messagebox.showinfo("Success", "Face encoding captured from photo!")
@@ -67,59 +83,85 @@ class FaceRecognitionApp:
 
     def show_image(self, img_path):
         # Carrega e exibe uma imagem na interface
-        image = Image.open(img_path)
-        image = image.resize((400, 300), Image.LANCZOS)  # Substitua ANTIALIAS por LANCZOS
-        imgtk = ImageTk.PhotoImage(image=image)
-        self.video_frame.imgtk = imgtk
-        self.video_frame.configure(image=imgtk)
+        self.video_frame.show(cv2.imread(img_path))
 
     def start_video(self):
         # Inicia a detecção de rostos usando o vídeo ao vivo
-        self.cap = cv2.VideoCapture(0)
-
-        if not self.cap.isOpened():
+        if self.pipeline:
+            self.pipeline.stop()
+        self.scheduler = DetectionScheduler(scale=0.5, target_fps=10)
+        self.tracker = FaceTracker(refresh_interval=30)
+        self.faces = []
+        self.pipeline = FramePipeline(0, self.match_faces, queue_depth=1, max_frame_age=0.5, metrics=self.metrics)
+
+        if not self.pipeline.is_opened():
             messagebox.showerror("Error", "Could not open webcam")
             return
 
+        self.pipeline.start()
         self.detect_faces_in_video()
 
-    def detect_faces_in_video(self):
-        # Detecta rostos no vídeo ao vivo e compara com o rosto capturado
-        ret, frame = self.cap.read()
-        if ret:
+    def match_faces(self, frame):
+        # Executado na thread de inferência: detecta rostos e compara com o rosto capturado
+        with self.metrics.time("color"):
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(rgb_frame)
-            face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-
-            for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                matches = face_recognition.compare_faces([self.photo_encoding], face_encoding)
-                distance_face = face_recognition.face_distance([self.photo_encoding], face_encoding)
-
-                index = np.argmin(distance_face)
-                nomes = ['Francisco','Flavica']
-                if matches[index]:
-                    print(nomes[index])
-
-
-                if True in matches:
-                    cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                    cv2.putText(frame, "Francisco", (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-                else:
-                    cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 2)
-                    cv2.putText(frame, "No", (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
-
-            # Converte o quadro para exibir no Tkinter
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame)
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.video_frame.imgtk = imgtk
-            self.video_frame.configure(image=imgtk)
-
-            # Continuar a exibição do vídeo
-            self.video_frame.after(10, self.detect_faces_in_video)
-        else:
+        with self.metrics.time("detect"):
+            face_locations = self.scheduler.locations(rgb_frame)
+        if not self.scheduler.fresh:
+            # Frame sem detecção nova: mantém o último resultado
+            return self.faces
+
+        # Encoding apenas dos rostos novos ou que se moveram muito
+        tracks = self.tracker.recognize(rgb_frame, face_locations, self.encode, self.match)
+        self.faces = [(track.location, track.name) for track in tracks]
+        timer.mark("primeiro frame reconhecido")
+        return self.faces
+
+    def compare_with_photo(self, face_encodings):
+        # Compara os rostos com o rosto capturado; retorna (casou?, distância) de cada um
+        import face_recognition
+
+        matches, distances = [], []
+        for face_encoding in face_encodings:
+            match = face_recognition.compare_faces([self.photo_encoding], face_encoding)
+            distance_face = face_recognition.face_distance([self.photo_encoding], face_encoding)
+
+            index = np.argmin(distance_face)
+            nomes = ['Francisco','Flavica']
+            if match[index]:
+                print(nomes[index])
+
+            matches.append(True in match)
+            distances.append(distance_face[index])
+        return matches, distances
+
+    def detect_faces_in_video(self):
+        # Desenha o frame mais recente com o resultado de reconhecimento mais recente
+        frame, faces = self.pipeline.latest()
+        if frame is not None:
+            with self.metrics.time("render"):
+                image = frame.image.copy()
+                for (top, right, bottom, left), matched in faces or []:
+                    if matched:
+                        cv2.rectangle(image, (left, top), (right, bottom), (0, 255, 0), 2)
+                        cv2.putText(image, "Francisco", (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+                    else:
+                        cv2.rectangle(image, (left, top), (right, bottom), (0, 0, 255), 2)
+                        cv2.putText(image, "No", (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+                if self.show_metrics.get():
+                    draw_overlay(image, self.metrics)
+
+                # Exibe no Tkinter (conversão de cor e PhotoImage reaproveitados pelo VideoView)
+                self.video_frame.show(image)
+            self.pipeline.render_stats.record(self.pipeline.latency(frame))
+            self.metrics.record("end_to_end", self.pipeline.latency(frame))
+        elif not self.pipeline.grabber.is_alive():
             messagebox.showerror("Error", "Failed to read frame from webcam")
-            self.cap.release()
+            self.pipeline.stop()
+            return
+
+        # Continuar a exibição do vídeo
+        self.video_frame.after(10, self.detect_faces_in_video)
 
 if __name__ == "__main__":
     root = tk.Tk()
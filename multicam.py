@@ -0,0 +1,202 @@
+"""Várias câmeras em um único serviço, com um pool de inferência compartilhado
+
+Cada fonte (índice de câmera, arquivo ou URL RTSP) tem sua thread de captura, que mantém só
+os frames mais recentes. Um despachante escolhe a próxima fonte por escalonamento justo
+ponderado, com no máximo um frame por fonte no pool, e assim uma câmera movimentada não
+deixa as outras sem processamento.
+
+Uso: python multicam.py 0 1 corredor.mp4@2 --workers 4
+(o sufixo @N dá peso N à fonte)
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+import cv2
+
+from face_store import DEFAULT_STORE_PATH, open_store
+from pipeline import DropQueue, FrameGrabber, StageStats
+from process_video import annotate, init_video_worker, process_chunk
+
+
+def parse_source(text):
+    """'0' -> câmera 0; 'arquivo.mp4@2' -> arquivo com peso 2"""
+    source, weight = text, 1.0
+    head, _, tail = text.rpartition("@")
+    if head:
+        try:
+            source, weight = head, float(tail)
+        except ValueError:
+            # '@' de uma URL com usuário, não um peso
+            pass
+    return (int(source) if source.isdigit() else source), weight
+
+
+class CameraSource:
+    """Uma fonte de vídeo com sua fila de frames, peso no escalonamento e estatísticas"""
+
+    def __init__(self, name, source, weight=1.0, queue_depth=1):
+        self.name = name
+        self.weight = weight
+        self.capture_stats = StageStats(f"{name} captura")
+        self.inference_stats = StageStats(f"{name} inferência")
+        self.queue = DropQueue(queue_depth, self.capture_stats)
+        # Arquivos locais fazem o papel de câmeras: são lidos no ritmo do próprio vídeo
+        realtime = isinstance(source, str) and os.path.isfile(source)
+        self.grabber = FrameGrabber(source, [self.queue], self.capture_stats, realtime=realtime)
+
+        self.served = 0  # frames enviados ao pool (para o escalonamento justo)
+        self.busy = False  # há um frame desta fonte no pool
+        self.latest = None  # (frame, rostos) do último resultado
+
+    @property
+    def virtual_time(self):
+        return self.served / self.weight
+
+
+class MultiCameraService:
+    def __init__(self, sources, workers, detector="hog", scale=0.5, store=DEFAULT_STORE_PATH,
+                 tolerance=0.6, queue_depth=1, max_frame_age=1.0):
+        self.sources = [CameraSource(f"cam{i}", source, weight, queue_depth)
+                        for i, (source, weight) in enumerate(sources)]
+        self.workers = workers
+        self.detector = detector
+        self.scale = scale
+        self.tolerance = tolerance
+        self.max_frame_age = max_frame_age
+        self.gallery = open_store(store).load_gallery()
+        self.executor = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = threading.Event()
+
+    def start(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_video_worker,
+                                            initargs=(self.detector, 32))
+        for source in self.sources:
+            source.grabber.start()
+        self._running.set()
+        threading.Thread(target=self._dispatch, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running.clear()
+        self._wakeup.set()
+        for source in self.sources:
+            source.grabber.stop()
+        if self.executor:
+            self.executor.shutdown(cancel_futures=True)
+
+    def _next_source(self):
+        """Fonte ociosa com frame disponível e menor tempo virtual (frames servidos / peso)"""
+        ready = [s for s in self.sources if not s.busy and len(s.queue)]
+        return min(ready, key=lambda s: s.virtual_time) if ready else None
+
+    def _charge(self, source):
+        """Contabiliza um frame de `source` enviado ao pool e marca a fonte como ocupada"""
+        # Uma fonte que ficou parada (ou começou depois) não acumula crédito: fica no máximo um
+        # frame atrás do menor tempo virtual entre as outras fontes que disputam o pool (ocupadas
+        # ou com frame pronto). Um frame de atraso é o normal de quem está na vez, e não é tirado
+        competing = [s.virtual_time for s in self.sources if s is not source and (s.busy or len(s.queue))]
+        if competing:
+            source.served = max(source.served, min(competing) * source.weight - 1)
+        source.served += 1
+        source.busy = True
+
+    def _dispatch(self):
+        in_flight = 0
+        while self._running.is_set():
+            with self._lock:
+                source = self._next_source() if in_flight < self.workers else None
+                frame = source.queue.get(timeout=0) if source else None
+                if frame is not None and time.perf_counter() - frame.timestamp > self.max_frame_age:
+                    source.capture_stats.drop()
+                    continue
+                if frame is not None:
+                    self._charge(source)
+                    in_flight += 1
+
+            if frame is None:
+                self._wakeup.wait(0.005)
+                self._wakeup.clear()
+                continue
+
+            future = self.executor.submit(process_chunk, [frame.image], self.scale, True)
+
+            def done(future, source=source, frame=frame):
+                nonlocal in_flight
+                try:
+                    locations, encodings = future.result()[0]
+                except CancelledError:
+                    # stop() cancelou o frame antes de ele chegar a um worker
+                    faces = []
+                except Exception as exc:
+                    print(f"{source.name}: falha na inferência: {exc}")
+                    faces = []
+                else:
+                    names, distances = self.gallery.nearest(encodings, self.tolerance)
+                    faces = list(zip([tuple(int(v) for v in box) for box in locations], names, distances))
+                    source.inference_stats.record(time.perf_counter() - frame.timestamp)
+                    source.latest = (frame, faces)
+                with self._lock:
+                    source.busy = False
+                    in_flight -= 1
+                self._wakeup.set()
+
+            future.add_done_callback(done)
+
+    def report(self):
+        lines = []
+        for source in self.sources:
+            capture = source.capture_stats.snapshot()
+            inference = source.inference_stats.snapshot()
+            lines.append(f"{source.name} (peso {source.weight:g}): captura {capture['fps']:.1f} fps, "
+                         f"processado {inference['fps']:.1f} fps, latência {inference['latency_ms']:.0f} ms, "
+                         f"{capture['dropped']} descartados")
+        return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sources", nargs="+", help="índice da câmera, arquivo ou URL, com @peso opcional")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--detector", choices=["hog", "cnn", "ssd"], default="hog")
+    parser.add_argument("--scale", type=float, default=0.5)
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--queue-depth", type=int, default=1, help="frames guardados por fonte")
+    parser.add_argument("--max-frame-age", type=float, default=1.0, help="descarta frames mais velhos (s)")
+    parser.add_argument("--report-every", type=float, default=5.0)
+    parser.add_argument("--show", action="store_true", help="mostra uma janela por câmera")
+    args = parser.parse_args()
+
+    service = MultiCameraService([parse_source(s) for s in args.sources], args.workers, args.detector,
+                                 args.scale, args.store, queue_depth=args.queue_depth,
+                                 max_frame_age=args.max_frame_age).start()
+    last_report = time.perf_counter()
+    try:
+        while any(s.grabber.is_alive() for s in service.sources):
+            if args.show:
+                for source in service.sources:
+                    if source.latest:
+                        frame, faces = source.latest
+                        cv2.imshow(source.name, annotate(frame.image.copy(), faces))
+                if cv2.waitKey(10) & 0xFF == ord("q"):
+                    break
+            else:
+                time.sleep(0.1)
+            if time.perf_counter() - last_report > args.report_every:
+                print(service.report() + "\n")
+                last_report = time.perf_counter()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        print(service.report())
+        if args.show:
+            cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,130 @@
-import face_recognition
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import HTMLResponse
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from startup import timer
+
+import asyncio
+import io
+import time
+import zipfile
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import numpy as np
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-import uvicorn
 
-app = FastAPI()
+from batching import MicroBatcher
+from encoding_cache import EncodingCache
+from face_store import StoreWatcher, open_store
+from ingest import DETECT_MAX_SIDE, ImageTooLarge
+from inference_pool import (InferencePool, PoolBusy, detect_encode_image_bytes, encode_image_batch, encode_image_bytes,
+                            encode_image_regions)
+from metrics import Metrics
+from streaming import StreamSession
+from tracking import FaceTracker
+
+# Pool de processos para a decodificação e o encoding (configurável por FACE_POOL_WORKERS,
+# FACE_POOL_MAX_PENDING e FACE_REQUEST_TIMEOUT)
+pool = InferencePool()
+
+# Micro-lotes: requisições simultâneas de /uploadfile/ esperam até FACE_MICROBATCH_MS
+# milissegundos para irem juntas ao pool, em tarefas de pelo menos MICROBATCH_MIN_CHUNK imagens
+# por worker, e a comparação com Obama é feita uma vez para o lote inteiro (0 desliga)
+MICROBATCH_DELAY = float(os.environ.get("FACE_MICROBATCH_MS", 5)) / 1000.0
+MICROBATCH_SIZE = int(os.environ.get("FACE_MICROBATCH_SIZE", 8))
+MICROBATCH_MIN_CHUNK = 2
+
+# Galeria de rostos conhecidos (a mesma gravada por teste5.py/teste6.py), recarregada em
+# segundo plano quando o arquivo muda. FACE_GALLERY_QUANT=int8 (ou float16) mantém a galeria
+# comprimida em memória
+STORE_PATH = os.environ.get("FACE_STORE", os.path.join(ROOT, "known_faces"))
+STORE_POLL_INTERVAL = float(os.environ.get("FACE_STORE_POLL", 2.0))
+watcher = StoreWatcher(open_store(STORE_PATH, os.path.join(ROOT, "known_faces.pkl")), STORE_POLL_INTERVAL)
+
+# Cache de (caixas, encodings) por conteúdo da imagem: uploads repetidos não voltam ao pool.
+# FACE_CACHE_DIR liga a camada em disco. A detecção roda numa cópia com no máximo
+# FACE_DETECT_MAX_SIDE pixels no lado maior, e imagens acima de FACE_MAX_PIXELS são recusadas (413)
+ENCODE_PARAMS = {"op": "encode_image_bytes", "model": "hog", "upsample": 1, "max_side": DETECT_MAX_SIDE}
+cache = EncodingCache(max_items=int(os.environ.get("FACE_CACHE_SIZE", 4096)),
+                      disk_path=os.environ.get("FACE_CACHE_DIR") or None,
+                      max_disk_bytes=int(os.environ.get("FACE_CACHE_DISK_MB", 512)) * 1024 * 1024)
+
+# Percentis de latência por estágio e por rota, expostos em /metrics
+metrics = Metrics()
+
+# Limites do endpoint em lote
+MAX_BATCH_FILES = 256
+MAX_ZIP_BYTES = 200 * 1024 * 1024
+
+# Máximo de candidatos por rosto em /identify/
+MAX_CANDIDATES = 50
+
+# Streaming (/stream): cada rosto acompanhado é recodificado a cada FACE_STREAM_REFRESH frames
+# (ou antes, se a caixa mudar muito); as conexões abertas aparecem em /stream/stats
+STREAM_REFRESH_FRAMES = int(os.environ.get("FACE_STREAM_REFRESH", 30))
+streams = {}
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Os workers aquecem em segundo plano: o servidor aceita conexões logo, /health responde
+    # 503 até o fim do aquecimento e as primeiras requisições só esperam na fila do pool
+    timer.mark("servidor importado")
+    pool.start(wait=False)
+    watcher.start()
+    warming = asyncio.get_running_loop().run_in_executor(None, pool.wait_ready)
+    warming.add_done_callback(lambda f: f.exception() or timer.mark("workers aquecidos"))
+    yield
+    watcher.stop()
+    pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    # Tempo total por rota (o modelo da rota, não a URL, para não criar uma série por requisição)
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    name = f"http {request.method} {route.path if route else 'other'}"
+    metrics.record(name, time.perf_counter() - start)
+    if response.status_code >= 500:
+        metrics.stage(name).error()
+    return response
+
+# Pre-calculado face encoding de Obama
+OBAMA_ENCODING = np.array([-0.09634063, 0.12095481, -0.00436332, -0.07643753, 0.0080383,
+                           0.01902981, -0.07184699, -0.09383309, 0.18518871, -0.09588896,
+                           0.23951106, 0.0986533, -0.22114635, -0.1363683, 0.04405268,
+                           0.11574756, -0.19899382, -0.09597053, -0.11969153, -0.12277931,
+                           0.03416885, -0.00267565, 0.09203379, 0.04713435, -0.12731361,
+                           -0.35371891, -0.0503444, -0.17841317, -0.00310897, -0.09844551,
+                           -0.06910533, -0.00503746, -0.18466514, -0.09851682, 0.02903969,
+                           -0.02174894, 0.02261871, 0.0032102, 0.20312519, 0.02999607,
+                           -0.11646006, 0.09432904, 0.02774341, 0.22102901, 0.26725179,
+                           0.06896867, -0.00490024, -0.09441824, 0.11115381, -0.22592428,
+                           0.06230862, 0.16559327, 0.06232892, 0.03458837, 0.09459756,
+                           -0.18777156, 0.00654241, 0.08582542, -0.13578284, 0.0150229,
+                           0.00670836, -0.08195844, -0.04346499, 0.03347827, 0.20310158,
+                           0.09987706, -0.12370517, -0.06683611, 0.12704916, -0.02160804,
+                           0.00984683, 0.00766284, -0.18980607, -0.19641446, -0.22800779,
+                           0.09010898, 0.39178532, 0.18818057, -0.20875394, 0.03097027,
+                           -0.21300618, 0.02532415, 0.07938635, 0.01000703, -0.07719778,
+                           -0.12651891, -0.04318593, 0.06219772, 0.09163868, 0.05039065,
+                           -0.04922386, 0.21839413, -0.02394437, 0.06173781, 0.0292527,
+                           0.06160797, -0.15553983, -0.02440624, -0.17509389, -0.0630486,
+                           0.01428208, -0.03637431, 0.03971229, 0.13983178, -0.23006812,
+                           0.04999552, 0.0108454, -0.03970895, 0.02501768, 0.08157793,
+                           -0.03224047, -0.04502571, 0.0556995, -0.24374914, 0.25514284,
+                           0.24795187, 0.04060191, 0.17597422, 0.07966681, 0.01920104,
+                           -0.01194376, -0.02300822, -0.17204897, -0.0596558, 0.05307484,
+                           0.07417042, 0.07126575, 0.00209804], dtype=np.float32)
 
 # Permitir apenas arquivos com estas extensões
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
@@ -15,11 +135,148 @@ class FaceRecognitionResponse(BaseModel):
     is_picture_of_obama: bool
 
 
+class FaceResult(BaseModel):
+    box: List[int]  # top, right, bottom, left
+    is_picture_of_obama: bool
+    distance: float
+
+
+class ImageResult(BaseModel):
+    filename: str
+    faces: List[FaceResult] = []
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    images: List[ImageResult]
+
+
+class Candidate(BaseModel):
+    name: str
+    distance: float
+
+
+class IdentifiedFace(BaseModel):
+    box: List[int]  # top, right, bottom, left
+    name: Optional[str]  # mais próximo dentro da tolerância, ou None
+    candidates: List[Candidate]
+
+
+class IdentifyResponse(BaseModel):
+    faces: List[IdentifiedFace]
+    gallery_size: int
+
+
 # Verifica se o arquivo possui uma extensão válida
 def allowed_file(filename: str):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+async def run_in_pool(fn, *args, timeout=None):
+    """Executa no pool de processos, convertendo fila cheia em 503 e timeout em 504"""
+    try:
+        with metrics.time("pool"):
+            return await pool.run(fn, *args, timeout=timeout)
+    except PoolBusy:
+        metrics.count("pool_busy")
+        raise HTTPException(status_code=503, detail="Server busy, try again later")
+    except asyncio.TimeoutError:
+        metrics.count("pool_timeout")
+        raise HTTPException(status_code=504, detail="Face recognition timed out")
+
+
+async def encode_batch_in_pool(datas, min_chunk=1):
+    """encode_image_batch dividido entre os workers, para que um lote não rode inteiro em um só
+    processo, mas com pelo menos `min_chunk` imagens por tarefa; o timeout de cada tarefa cresce
+    com o número de imagens dela
+
+    Uma tarefa que falha (503/504) vira a exceção de cada imagem dela, sem afetar as outras.
+    """
+    chunk = max(-(-len(datas) // pool.workers), min_chunk)
+    chunks = [datas[j:j + chunk] for j in range(0, len(datas), chunk)]
+    parts = await asyncio.gather(*[run_in_pool(encode_image_batch, part, timeout=pool.timeout * len(part))
+                                   for part in chunks], return_exceptions=True)
+    return [result for part, outcome in zip(chunks, parts)
+            for result in ([outcome] * len(part) if isinstance(outcome, BaseException) else outcome)]
+
+
+async def encode_and_match_batch(datas):
+    """Micro-lote de /uploadfile/: encoding no pool e distâncias a Obama de todas as imagens juntas"""
+    return with_obama_distances(await encode_batch_in_pool(datas, MICROBATCH_MIN_CHUNK))
+
+
+batcher = MicroBatcher(encode_and_match_batch, max_batch=MICROBATCH_SIZE, max_delay=MICROBATCH_DELAY)
+
+
+async def encode_upload(data):
+    """(caixas, encodings, distâncias a Obama) de uma única imagem (via cache), agrupada em
+    micro-lote com as requisições simultâneas"""
+    with metrics.time("cache"):
+        key = cache.key(data, **ENCODE_PARAMS)
+        result = cache.get(key)
+    if result is not None:
+        metrics.count("cache_hit")
+        return with_obama_distances([result])[0]
+    metrics.count("cache_miss")
+
+    if MICROBATCH_DELAY <= 0:
+        try:
+            result = await run_in_pool(encode_image_bytes, data)
+        except ImageTooLarge as exc:
+            raise HTTPException(status_code=413, detail=str(exc))
+        except (OSError, ValueError):
+            # UnidentifiedImageError (um OSError) ou arquivo truncado: o mesmo 400 do micro-lote
+            raise HTTPException(status_code=400, detail="Could not decode image")
+        result = with_obama_distances([result])[0]
+    else:
+        with metrics.time("microbatch"):
+            result = await batcher.submit(data)
+        if isinstance(result, str):
+            if result.startswith(ImageTooLarge.__name__):
+                raise HTTPException(status_code=413, detail=result)
+            raise HTTPException(status_code=400, detail="Could not decode image")
+    cache.put(key, result[:2])
+    return result
+
+
+def obama_distances(encodings):
+    """Distância de cada encoding ao encoding de Obama, de uma vez"""
+    return np.linalg.norm(np.asarray(encodings, dtype=np.float32).reshape(-1, 128) - OBAMA_ENCODING, axis=1)
+
+
+def with_obama_distances(results):
+    """Acrescenta a cada (caixas, encodings) as distâncias a Obama, numa única conta para todas as
+    imagens; mensagens de erro (str) passam direto"""
+    encoded = [result[1] for result in results if isinstance(result, tuple)]
+    if not encoded:
+        return results
+    distances = iter(np.split(obama_distances(np.concatenate([np.reshape(e, (-1, 128)) for e in encoded])),
+                              np.cumsum([len(e) for e in encoded])[:-1]))
+    return [result + (next(distances),) if isinstance(result, tuple) else result for result in results]
+
+
+def expand_uploads(uploads):
+    """Lista de (nome, bytes) a partir dos arquivos enviados, abrindo os .zip"""
+    items = []
+    for filename, data in uploads:
+        if filename.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(data))
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"Invalid zip file: {filename}")
+            entries = [e for e in archive.infolist() if not e.is_dir() and allowed_file(e.filename)]
+            if sum(e.file_size for e in entries) > MAX_ZIP_BYTES:
+                raise HTTPException(status_code=413, detail=f"Zip file too large: {filename}")
+            items.extend((f"{filename}/{e.filename}", archive.read(e)) for e in entries)
+        elif allowed_file(filename):
+            items.append((filename, data))
+        else:
+            raise HTTPException(status_code=400, detail=f"Invalid file format: {filename}")
+    if len(items) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FILES} images per request")
+    return items
+
+
 @app.get("/", response_class=HTMLResponse)
 async def main():
     content = """
@@ -45,39 +302,9 @@ async def upload_file(file: UploadFile = File(...)):
     if not allowed_file(file.filename):
         raise HTTPException(status_code=400, detail="Invalid file format")
 
-    # Carregar a imagem enviada
-    image = face_recognition.load_image_file(file.file)
-
-    # Pre-calculado face encoding de Obama
-    known_face_encoding = [-0.09634063, 0.12095481, -0.00436332, -0.07643753, 0.0080383,
-                           0.01902981, -0.07184699, -0.09383309, 0.18518871, -0.09588896,
-                           0.23951106, 0.0986533, -0.22114635, -0.1363683, 0.04405268,
-                           0.11574756, -0.19899382, -0.09597053, -0.11969153, -0.12277931,
-                           0.03416885, -0.00267565, 0.09203379, 0.04713435, -0.12731361,
-                           -0.35371891, -0.0503444, -0.17841317, -0.00310897, -0.09844551,
-                           -0.06910533, -0.00503746, -0.18466514, -0.09851682, 0.02903969,
-                           -0.02174894, 0.02261871, 0.0032102, 0.20312519, 0.02999607,
-                           -0.11646006, 0.09432904, 0.02774341, 0.22102901, 0.26725179,
-                           0.06896867, -0.00490024, -0.09441824, 0.11115381, -0.22592428,
-                           0.06230862, 0.16559327, 0.06232892, 0.03458837, 0.09459756,
-                           -0.18777156, 0.00654241, 0.08582542, -0.13578284, 0.0150229,
-                           0.00670836, -0.08195844, -0.04346499, 0.03347827, 0.20310158,
-                           0.09987706, -0.12370517, -0.06683611, 0.12704916, -0.02160804,
-                           0.00984683, 0.00766284, -0.18980607, -0.19641446, -0.22800779,
-                           0.09010898, 0.39178532, 0.18818057, -0.20875394, 0.03097027,
-                           -0.21300618, 0.02532415, 0.07938635, 0.01000703, -0.07719778,
-                           -0.12651891, -0.04318593, 0.06219772, 0.09163868, 0.05039065,
-                           -0.04922386, 0.21839413, -0.02394437, 0.06173781, 0.0292527,
-                           0.06160797, -0.15553983, -0.02440624, -0.17509389, -0.0630486,
-                           0.01428208, -0.03637431, 0.03971229, 0.13983178, -0.23006812,
-                           0.04999552, 0.0108454, -0.03970895, 0.02501768, 0.08157793,
-                           -0.03224047, -0.04502571, 0.0556995, -0.24374914, 0.25514284,
-                           0.24795187, 0.04060191, 0.17597422, 0.07966681, 0.01920104,
-                           -0.01194376, -0.02300822, -0.17204897, -0.0596558, 0.05307484,
-                           0.07417042, 0.07126575, 0.00209804]
-
-    # Obter os encodings das faces na imagem enviada
-    unknown_face_encodings = face_recognition.face_encodings(image)
+    # Decodificar e gerar os encodings em um processo do pool, sem bloquear o event loop
+    data = await file.read()
+    _, unknown_face_encodings, distances = await encode_upload(data)
 
     face_found = False
     is_obama = False
@@ -85,12 +312,159 @@ async def upload_file(file: UploadFile = File(...)):
     if len(unknown_face_encodings) > 0:
         face_found = True
         # Comparar a primeira face encontrada na imagem com a face de Obama
-        match_results = face_recognition.compare_faces([known_face_encoding], unknown_face_encodings[0])
-        is_obama = match_results[0]
+        is_obama = bool(distances[0] <= 0.6)
 
     # Retornar o resultado em JSON
     return FaceRecognitionResponse(face_found_in_image=face_found, is_picture_of_obama=is_obama)
 
 
+
+@app.post("/uploadfiles/", response_model=BatchResponse)
+async def upload_files(files: List[UploadFile] = File(...)):
+    # Várias imagens (ou arquivos .zip) em uma requisição; resultado por imagem e por rosto
+    items = expand_uploads([(file.filename, await file.read()) for file in files])
+    if not items:
+        return BatchResponse(images=[])
+
+    # Só as imagens fora do cache vão ao pool, divididas entre os workers
+    keys = [cache.key(data, **ENCODE_PARAMS) for _, data in items]
+    results = [cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        for i, result in zip(missing, await encode_batch_in_pool([items[i][1] for i in missing])):
+            results[i] = result
+            if isinstance(result, tuple):
+                cache.put(keys[i], result)
+        # Fila cheia ou timeout em parte do lote: o que terminou já está no cache para a nova tentativa
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    images = []
+    for (filename, _), result in zip(items, with_obama_distances(results)):
+        if isinstance(result, str):
+            images.append(ImageResult(filename=filename, error=result))
+            continue
+        locations, _, distances = result
+        faces = [FaceResult(box=[int(v) for v in box], is_picture_of_obama=bool(d <= 0.6), distance=float(d))
+                 for box, d in zip(locations, distances)]
+        images.append(ImageResult(filename=filename, faces=faces))
+    return BatchResponse(images=images)
+
+
+
+@app.post("/identify/", response_model=IdentifyResponse)
+async def identify(file: UploadFile = File(...), k: int = Query(3, ge=1, le=MAX_CANDIDATES), tolerance: float = 0.6):
+    # Identifica todos os rostos da imagem contra a galeria de rostos conhecidos
+    if not allowed_file(file.filename):
+        raise HTTPException(status_code=400, detail="Invalid file format")
+
+    locations, encodings, _ = await encode_upload(await file.read())
+
+    # Referência local: uma recarga durante a requisição não afeta esta busca
+    gallery = watcher.gallery
+    with metrics.time("match"):
+        indices, distances = gallery.top_k(encodings, k=k)
+    names = gallery.names
+
+    faces = []
+    for box, face_indices, face_distances in zip(locations, indices, distances):
+        candidates = [Candidate(name=names[i], distance=float(d)) for i, d in zip(face_indices, face_distances)]
+        best = candidates[0].name if candidates and candidates[0].distance <= tolerance else None
+        faces.append(IdentifiedFace(box=[int(v) for v in box], name=best, candidates=candidates))
+    return IdentifyResponse(faces=faces, gallery_size=len(gallery))
+
+
+
+@app.websocket("/stream")
+async def stream(websocket: WebSocket, tolerance: float = 0.6, model: str = "hog"):
+    # Frames JPEG (mensagens binárias) de uma câmera remota; para cada frame processado responde
+    # um JSON com caixas, identidades e estatísticas da conexão. Só o frame mais recente espera
+    # processamento: os que chegam enquanto o anterior está no pool substituem o pendente
+    await websocket.accept()
+    tracker = FaceTracker(refresh_interval=STREAM_REFRESH_FRAMES)
+
+    async def recognize(data):
+        # Só os rostos novos ou que mudaram são codificados, na mesma chamada da detecção; os demais
+        # mantêm a identidade
+        with metrics.time("stream detect"):
+            locations, indices, encodings = await run_in_pool(
+                detect_encode_image_bytes, data, tracker.fresh_boxes(), tracker.reencode_iou, model)
+        tracks = tracker.update(locations)
+        stale = tracker.stale(tracks)
+        by_index = dict(zip(indices, encodings))
+        missing = [i for i, t in enumerate(tracks) if t in stale and i not in by_index]
+        if missing:
+            # Raro: o tracker associou uma caixa a outro track que não o de boxes_to_encode
+            with metrics.time("stream encode"):
+                by_index.update(zip(missing, await run_in_pool(encode_image_regions, data,
+                                                              [tracks[i].location for i in missing])))
+        if stale:
+            encoded = [(t, by_index[i]) for i, t in enumerate(tracks) if t in stale]
+            with metrics.time("match"):
+                names, distances = watcher.gallery.nearest([e for _, e in encoded], tolerance)
+            tracker.assign(encoded, names, distances)
+        # Galeria vazia dá distância infinita, que não é JSON válido
+        return {"faces": [{"box": list(t.location), "track": t.id, "name": t.name,
+                           "distance": float(t.distance) if t.distance is not None and np.isfinite(t.distance)
+                           else None} for t in tracks]}
+
+    session = StreamSession(recognize)
+    streams[id(session)] = session
+
+    async def receive():
+        try:
+            while True:
+                session.receive(await websocket.receive_bytes())
+        except (WebSocketDisconnect, KeyError):
+            pass
+        finally:
+            session.close()
+
+    receiver = asyncio.ensure_future(receive())
+    try:
+        async for result in session.results():
+            metrics.record("stream frame", result["latency_ms"] / 1000.0)
+            await websocket.send_json(result)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        streams.pop(id(session), None)
+        metrics.count("stream_frames_dropped", session.slot.dropped)
+        print(f"Stream encerrado: {session.stats()}")
+
+
+@app.get("/stream/stats")
+async def stream_stats():
+    # fps, latência e frames descartados de cada conexão de streaming aberta
+    return [session.stats() for session in streams.values()]
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    # Contadores de acerto/erro do cache de encodings
+    return cache.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    # Percentis por estágio/rota e contadores no formato de texto do Prometheus
+    gauges = {"gallery_size": len(watcher.gallery), "cache_memory_items": cache.stats()["memory_items"],
+              "microbatch_mean_size": batcher.mean_batch_size, "ready": int(pool.ready),
+              "stream_connections": len(streams)}
+    return PlainTextResponse(metrics.prometheus(gauges=gauges), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health")
+async def health():
+    # Prontidão para balanceadores/orquestradores: 503 enquanto os workers aquecem
+    ready = pool.ready
+    body = {"ready": ready, "workers": pool.workers, "startup_ms": timer.report()}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=5001)
@@ -2,13 +2,19 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import cv2
 import numpy as np
-from PIL import Image, ImageTk
 import face_recognition
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from detectors import get_detector
+from tracking import FaceTracker
+from video_view import VideoView
 
 class FaceDetectionApp:
     def __init__(self, root):
         self.root = root
-        self.root.title("Detecção de Rosto com SSD")
+        self.root.title("Detecção de Rosto")
 
         # Botões para abrir vídeo e usar webcam
         self.btn_open_video = tk.Button(self.root, text="Abrir Vídeo", command=self.open_video)
@@ -21,58 +27,53 @@ class FaceDetectionApp:
         self.btn_capture_face = tk.Button(self.root, text="Capturar Rosto", command=self.capture_face, state=tk.DISABLED)
         self.btn_capture_face.pack()
 
-        # Label para exibir o vídeo
-        self.label = tk.Label(self.root)
-        self.label.pack()
+        # Área para exibir o vídeo
+        self.view = VideoView(self.root, width=640, height=480)
+        self.view.pack()
 
         # Variável para capturar vídeo
         self.cap = None
         self.face_image = None
         self.face_encoding = None
 
-        # Carregar o modelo SSD
-        self.net = self.load_ssd_model()
+        # Detector escolhido pela configuração (FACE_DETECTOR=hog|cnn|ssd, SSD por padrão); a rede
+        # do SSD é carregada uma vez e compartilhada
+        self.detector = get_detector(default="ssd")
 
-    def load_ssd_model(self):
-        """Carregar o modelo SSD"""
-        model_file = "deploy.prototxt.txt"  # Arquivo do modelo
-        weights_file = "res10_300x300_ssd_iter_140000.caffemodel"  # Pesos pré-treinados
-        net = cv2.dnn.readNetFromCaffe(model_file, weights_file)
-        return net
+        # Cache de encodings por rosto acompanhado entre frames
+        self.tracker = FaceTracker(refresh_interval=30)
 
     def detect_faces(self, frame):
         """Detectar rostos no frame"""
-        h, w = frame.shape[:2]
-        blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
-        self.net.setInput(blob)
-        detections = self.net.forward()
-
-        for i in range(detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-            if confidence > 0.5:
-                box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                (startX, startY, endX, endY) = box.astype("int")
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        face_locations, confidences = self.detector.detect_with_confidence(rgb_frame)
 
-                # Desenhar um retângulo ao redor do rosto detectado
-                cv2.rectangle(frame, (startX, startY), (endX, endY), (0, 255, 0), 2)
+        for (startY, endX, endY, startX), confidence in zip(face_locations, confidences):
+            # Desenhar um retângulo ao redor do rosto detectado
+            cv2.rectangle(frame, (startX, startY), (endX, endY), (0, 255, 0), 2)
 
-                # Exibir a confiança como texto ao lado do rosto
+            # Exibir a confiança como texto ao lado do rosto (só o SSD dá uma pontuação)
+            if confidence is not None:
                 text = f"{confidence * 100:.2f}%"
                 y = startY - 10 if startY - 10 > 10 else startY + 10
                 cv2.putText(frame, text, (startX, y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 0), 2)
 
-                # Captura da imagem do rosto
-                self.face_image = frame[startY:endY, startX:endX]
+            # Captura da imagem do rosto
+            self.face_image = frame[startY:endY, startX:endX]
 
-                # Codificar o rosto diretamente
-                rgb_face_image = cv2.cvtColor(self.face_image, cv2.COLOR_BGR2RGB)
-                self.face_encoding = face_recognition.face_encodings(rgb_face_image)
-
-                if self.face_encoding:
-                    self.face_encoding = self.face_encoding[0]  # Pega a codificação do primeiro rosto detectado
+        # Codificar apenas os rostos novos ou que se moveram; os demais vêm do cache do tracker
+        tracks = self.tracker.recognize(rgb_frame, face_locations, self.encode_faces,
+                                        lambda encodings: ([None] * len(encodings), [None] * len(encodings)))
+        for track in tracks:
+            if track.encoding is not None:
+                self.face_encoding = track.encoding
 
         return frame
 
+    def encode_faces(self, rgb_frame, face_locations):
+        """Codificar os rostos no frame inteiro a partir das caixas do detector, sem detectar de novo"""
+        return face_recognition.face_encodings(rgb_frame, known_face_locations=face_locations)
+
     def open_video(self):
         """Abrir um arquivo de vídeo"""
         file_path = filedialog.askopenfilename(filetypes=[("Video files", "*.mp4 *.avi")])
@@ -91,21 +92,17 @@ class FaceDetectionApp:
         self.update_frame()
 
     def update_frame(self):
-        """Atualizar o frame no label"""
+        """Atualizar o frame na tela"""
         ret, frame = self.cap.read()
         if ret:
             # Detectar rostos no frame
             frame = self.detect_faces(frame)
 
-            # Converter o frame para exibir na interface Tkinter
-            cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(cv2image)
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.label.imgtk = imgtk
-            self.label.configure(image=imgtk)
+            # Exibir na interface Tkinter (reaproveita o mesmo PhotoImage)
+            self.view.show(frame)
         
         # Atualizar o frame continuamente
-        self.label.after(10, self.update_frame)
+        self.view.after(10, self.update_frame)
 
     def capture_face(self):
         """Capturar a imagem do rosto"""
@@ -1,15 +1,27 @@
 from PIL import Image
 import face_recognition
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from encoding_cache import EncodingCache
+
+# Results are cached on disk by image content, so running this again skips the analysis
+cache = EncodingCache(disk_path=".face_cache")
 
 # Load the jpg file into a numpy array
-image = face_recognition.load_image_file("biden.jpg")
+with open("biden.jpg", "rb") as f:
+    image_data = f.read()
+image = face_recognition.load_image_file(io.BytesIO(image_data))
 
 # Find all the faces in the image using the default HOG-based model.
 # This method is fairly accurate, but not as accurate as the CNN model and not GPU accelerated.
 # See also: find_faces_in_picture_cnn.py
-face_locations = face_recognition.face_locations(image)
+face_locations = cache.get_or_compute(image_data, lambda: face_recognition.face_locations(image), op="face_locations", model="hog")
 
 print("I found {} face(s) in this photograph.".format(len(face_locations)))
+print("Cache: {}".format(cache.stats()))
 
 for face_location in face_locations:
 
@@ -1,13 +1,30 @@
 from PIL import Image, ImageDraw
 import face_recognition
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis import analyze
+from encoding_cache import EncodingCache
+
+# Results are cached on disk by image content, so running this again skips the analysis
+cache = EncodingCache(disk_path=".face_cache")
 
 # Load the jpg file into a numpy array
-image = face_recognition.load_image_file("biden.jpg")
+with open("biden.jpg", "rb") as f:
+    image_data = f.read()
+image = face_recognition.load_image_file(io.BytesIO(image_data))
 
-# Find all facial features in all the faces in the image
-face_landmarks_list = face_recognition.face_landmarks(image)
+# Find all facial features in all the faces in the image (one detection, one shape predictor
+# pass per face; only landmarks are needed, so the encoder is skipped)
+analysis = cache.get_or_compute(image_data,
+                                lambda: analyze(image, detector="hog", landmarks="large", encodings=False),
+                                op="analyze", landmarks="large", detector="hog", encodings=False)
+face_landmarks_list = analysis.landmark_dicts()
 
 print("I found {} face(s) in this photograph.".format(len(face_landmarks_list)))
+print("Cache: {}".format(cache.stats()))
 
 # Create a PIL imagedraw object so we can draw on the picture
 pil_image = Image.fromarray(image)
@@ -2,12 +2,17 @@ import tkinter as tk
 from tkinter import filedialog
 import cv2
 import numpy as np
-from PIL import Image, ImageTk
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from detectors import get_detector
+from video_view import VideoView
 
 class FaceDetectionApp:
     def __init__(self, root):
         self.root = root
-        self.root.title("Detecção de Rosto com SSD")
+        self.root.title("Detecção de Rosto")
 
         # Botão para abrir um vídeo
         self.btn_open_video = tk.Button(self.root, text="Abrir Vídeo", command=self.open_video)
@@ -17,40 +22,27 @@ class FaceDetectionApp:
         self.btn_webcam = tk.Button(self.root, text="Usar Webcam", command=self.use_webcam)
         self.btn_webcam.pack()
 
-        # Label para exibir o vídeo
-        self.label = tk.Label(self.root)
-        self.label.pack()
+        # Área para exibir o vídeo
+        self.view = VideoView(self.root, width=640, height=480)
+        self.view.pack()
 
         # Variável para capturar vídeo
         self.cap = None
 
-        # Carregar o modelo SSD
-        self.net = self.load_ssd_model()
-
-    def load_ssd_model(self):
-        """Função para carregar o modelo SSD"""
-        model_file = "deploy.prototxt.txt"  # Arquivo do modelo
-        weights_file = "res10_300x300_ssd_iter_140000.caffemodel"  # Pesos pré-treinados
-        net = cv2.dnn.readNetFromCaffe(model_file, weights_file)
-        return net
+        # Detector escolhido pela configuração (FACE_DETECTOR=hog|cnn|ssd, SSD por padrão); a rede
+        # do SSD é carregada uma vez e compartilhada
+        self.detector = get_detector(default="ssd")
 
     def detect_faces(self, frame):
         """Função para detectar rostos no frame"""
-        h, w = frame.shape[:2]
-        blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
-        self.net.setInput(blob)
-        detections = self.net.forward()
-
-        for i in range(detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-            if confidence > 0.5:
-                box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                (startX, startY, endX, endY) = box.astype("int")
+        locations, confidences = self.detector.detect_with_confidence(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
 
-                # Desenhar um retângulo ao redor do rosto detectado
-                cv2.rectangle(frame, (startX, startY), (endX, endY), (0, 255, 0), 2)
+        for (startY, endX, endY, startX), confidence in zip(locations, confidences):
+            # Desenhar um retângulo ao redor do rosto detectado
+            cv2.rectangle(frame, (startX, startY), (endX, endY), (0, 255, 0), 2)
 
-                # Exibir a confiança como texto ao lado do rosto
+            # Exibir a confiança como texto ao lado do rosto (só o SSD dá uma pontuação)
+            if confidence is not None:
                 text = f"{confidence * 100:.2f}%"  # Exibir a confiança como percentual
                 y = startY - 10 if startY - 10 > 10 else startY + 10
                 cv2.putText(frame, text, (startX, y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 0), 2)
@@ -75,21 +67,17 @@ class FaceDetectionApp:
         self.update_frame()
 
     def update_frame(self):
-        """Atualizar o frame no label"""
+        """Atualizar o frame na tela"""
         ret, frame = self.cap.read()
         if ret:
             # Detectar rostos no frame
             frame = self.detect_faces(frame)
 
-            # Converter o frame para exibir na interface Tkinter
-            cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(cv2image)
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.label.imgtk = imgtk
-            self.label.configure(image=imgtk)
+            # Exibir na interface Tkinter (reaproveita o mesmo PhotoImage)
+            self.view.show(frame)
         
         # Atualizar o frame continuamente
-        self.label.after(10, self.update_frame)
+        self.view.after(10, self.update_frame)
 
 # Interface gráfica Tkinter
 if __name__ == "__main__":
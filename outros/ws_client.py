@@ -0,0 +1,134 @@
+"""Cliente de teste do /stream da API: envia frames JPEG por WebSocket e mostra as respostas
+
+Lê uma câmera ou um arquivo de vídeo, envia cada frame sem esperar a resposta do anterior
+(o servidor descarta os que não consegue processar) e imprime, a cada segundo, fps enviados
+e recebidos, latência de ida e volta e os contadores da conexão no servidor.
+
+Uso: python ws_client.py --source 0 --show
+     python ws_client.py --source video.avi --fps 30 --frames 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import cv2
+import websockets
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from metrics import LatencyRing
+
+
+class StreamClient:
+    def __init__(self, url, source, fps=0.0, quality=80, width=640, frames=0, show=False):
+        self.url = url
+        self.capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+        self.interval = 1.0 / fps if fps else 0.0
+        self.quality = quality
+        self.width = width
+        self.max_frames = frames
+        self.show = show
+
+        self.sent = {}  # número do frame -> instante do envio
+        self.received = 0
+        self.rtt = LatencyRing("rtt")
+        self.server = {}
+        self.faces = []
+        self.started = time.perf_counter()
+
+    def encode(self, frame):
+        if self.width and frame.shape[1] > self.width:
+            height = int(frame.shape[0] * self.width / frame.shape[1])
+            frame = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return frame, buffer.tobytes()
+
+    async def send_frames(self, websocket):
+        seq = 0
+        while not self.max_frames or seq < self.max_frames:
+            start = time.perf_counter()
+            # A leitura bloqueia até o próximo frame da câmera; fica fora do event loop
+            ret, frame = await asyncio.to_thread(self.capture.read)
+            if not ret:
+                break
+            frame, data = self.encode(frame)
+            seq += 1
+            self.sent[seq] = time.perf_counter()
+            await websocket.send(data)
+
+            if self.show:
+                self.draw(frame)
+            if self.interval:
+                await asyncio.sleep(max(self.interval - (time.perf_counter() - start), 0.0))
+        # Dá tempo para a resposta do último frame pendente
+        await asyncio.sleep(1.0)
+
+    async def receive_results(self, websocket):
+        async for message in websocket:
+            result = json.loads(message)
+            sent_at = self.sent.pop(result["seq"], None)
+            # Frames descartados pelo servidor nunca recebem resposta
+            for seq in [s for s in self.sent if s < result["seq"]]:
+                del self.sent[seq]
+            if sent_at is not None:
+                self.rtt.record(time.perf_counter() - sent_at)
+            self.received += 1
+            self.server = result["stats"]
+            self.faces = result.get("faces", [])
+            if "error" in result:
+                print(f"Erro no frame {result['seq']}: {result['error']}")
+
+    def draw(self, frame):
+        for face in self.faces:
+            top, right, bottom, left = face["box"]
+            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+            label = face["name"] or f"#{face['track']}"
+            cv2.putText(frame, label, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 0.5, (255, 255, 255), 1)
+        cv2.imshow("Stream", frame)
+        cv2.waitKey(1)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        p50, p95, _ = self.rtt.percentiles()
+        return (f"{elapsed:5.1f}s  respostas {self.received / elapsed:5.1f} fps  "
+                f"ida e volta p50 {p50 * 1000:6.1f} p95 {p95 * 1000:6.1f} ms  "
+                f"servidor: recebidos {self.server.get('received', 0)}, processados {self.server.get('processed', 0)}, "
+                f"descartados {self.server.get('dropped', 0)}, latência p95 {self.server.get('p95_ms', 0.0)} ms")
+
+    async def report(self):
+        while True:
+            await asyncio.sleep(1.0)
+            print(self.summary())
+
+    async def run(self):
+        async with websockets.connect(self.url, max_size=None) as websocket:
+            receiver = asyncio.ensure_future(self.receive_results(websocket))
+            reporter = asyncio.ensure_future(self.report())
+            try:
+                await self.send_frames(websocket)
+            finally:
+                reporter.cancel()
+                receiver.cancel()
+        self.capture.release()
+        print(self.summary())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="ws://localhost:5001/stream")
+    parser.add_argument("--source", default="0", help="índice da câmera ou arquivo de vídeo")
+    parser.add_argument("--fps", type=float, default=0.0, help="limite de frames enviados por segundo (0: o da fonte)")
+    parser.add_argument("--quality", type=int, default=80, help="qualidade JPEG")
+    parser.add_argument("--width", type=int, default=640, help="reduz frames mais largos antes de enviar")
+    parser.add_argument("--frames", type=int, default=0, help="para depois de N frames (0: até o fim da fonte)")
+    parser.add_argument("--show", action="store_true", help="mostra o vídeo com as caixas recebidas")
+    args = parser.parse_args()
+
+    client = StreamClient(args.url, args.source, args.fps, args.quality, args.width, args.frames, args.show)
+    asyncio.run(client.run())
+
+
+if __name__ == "__main__":
+    main()
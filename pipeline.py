@@ -0,0 +1,216 @@
+import collections
+import threading
+import time
+
+import cv2
+
+
+class StageStats:
+    """Contadores de um estágio do pipeline: fps e latência média numa janela recente"""
+
+    def __init__(self, name, window=60):
+        self.name = name
+        self.count = 0
+        self.dropped = 0
+        self._times = collections.deque(maxlen=window)
+        self._latencies = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        with self._lock:
+            self.count += 1
+            self._times.append(time.perf_counter())
+            self._latencies.append(latency)
+
+    def drop(self, n=1):
+        with self._lock:
+            self.dropped += n
+
+    def snapshot(self):
+        with self._lock:
+            times, latencies = list(self._times), list(self._latencies)
+            count, dropped = self.count, self.dropped
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+        latency = sum(latencies) / len(latencies) if latencies else 0.0
+        return {"fps": fps, "latency_ms": latency * 1000.0, "count": count, "dropped": dropped}
+
+    def __str__(self):
+        s = self.snapshot()
+        return f"{self.name}: {s['fps']:.1f} fps, {s['latency_ms']:.1f} ms, {s['dropped']} descartados"
+
+
+class DropQueue:
+    """Fila limitada que descarta o item mais antigo quando cheia, em vez de bloquear"""
+
+    def __init__(self, maxsize=1, stats=None):
+        self.maxsize = maxsize
+        self.stats = stats
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                if self.stats:
+                    self.stats.drop()
+            self._items.append(item)
+            self._cond.notify()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, timeout=None):
+        """Retorna o próximo item, ou None se o tempo acabar"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            return self._items.popleft() if self._items else None
+
+
+class Frame:
+    """Frame capturado com número de sequência e instante da captura"""
+
+    __slots__ = ("seq", "image", "timestamp")
+
+    def __init__(self, seq, image, timestamp):
+        self.seq = seq
+        self.image = image
+        self.timestamp = timestamp
+
+
+class FrameGrabber(threading.Thread):
+    """Thread de captura: lê a câmera continuamente e mantém apenas o frame mais recente
+
+    Ler sem parar evita que os frames se acumulem no buffer do driver.
+    """
+
+    def __init__(self, source=0, outputs=(), stats=None, realtime=False, metrics=None):
+        super().__init__(daemon=True)
+        self.capture = cv2.VideoCapture(source)
+        self.outputs = list(outputs)
+        # Para arquivos usados no lugar de câmeras: lê no ritmo do fps do vídeo
+        self.frame_interval = 1.0 / (self.capture.get(cv2.CAP_PROP_FPS) or 30.0) if realtime else 0.0
+        self.stats = stats or StageStats("captura")
+        self.metrics = metrics
+        self.latest = None
+        self._running = threading.Event()
+
+    def is_opened(self):
+        return self.capture.isOpened()
+
+    def run(self):
+        self._running.set()
+        seq = 0
+        while self._running.is_set():
+            start = time.perf_counter()
+            ret, image = self.capture.read()
+            if not ret:
+                # Fim do arquivo ou câmera desconectada
+                break
+            seq += 1
+            frame = Frame(seq, image, time.perf_counter())
+            self.latest = frame
+            for queue in self.outputs:
+                queue.put(frame)
+            self.stats.record(time.perf_counter() - start)
+            if self.metrics:
+                self.metrics.record("capture", time.perf_counter() - start)
+            if self.frame_interval:
+                time.sleep(max(0.0, self.frame_interval - (time.perf_counter() - start)))
+        self._running.clear()
+
+    def stop(self):
+        self._running.clear()
+        if self.is_alive():
+            self.join(timeout=1.0)
+        self.capture.release()
+
+
+class InferenceWorker(threading.Thread):
+    """Thread de inferência: processa o frame mais novo e descarta frames velhos demais
+
+    `process` recebe a imagem BGR e retorna o resultado que será desenhado na renderização.
+    """
+
+    def __init__(self, process, queue_depth=1, max_frame_age=0.5, stats=None, metrics=None):
+        super().__init__(daemon=True)
+        self.process = process
+        self.max_frame_age = max_frame_age
+        self.stats = stats or StageStats("inferência")
+        self.metrics = metrics
+        self.queue = DropQueue(queue_depth, self.stats)
+        self.result = None
+        self.result_frame = None
+        self._running = threading.Event()
+
+    def run(self):
+        self._running.set()
+        while self._running.is_set():
+            frame = self.queue.get(timeout=0.1)
+            if frame is None:
+                continue
+            if self.max_frame_age and time.perf_counter() - frame.timestamp > self.max_frame_age:
+                self.stats.drop()
+                if self.metrics:
+                    self.metrics.count("stale_frames")
+                continue
+
+            start = time.perf_counter()
+            result = self.process(frame.image)
+            self.stats.record(time.perf_counter() - start)
+            if self.metrics:
+                self.metrics.record("inference", time.perf_counter() - start)
+            self.result, self.result_frame = result, frame
+
+    def stop(self):
+        self._running.clear()
+        if self.is_alive():
+            self.join(timeout=1.0)
+
+
+class FramePipeline:
+    """Pipeline captura -> inferência -> renderização
+
+    Captura e inferência rodam em threads próprias; a renderização é feita por quem chama
+    `latest()` (por exemplo, o loop `after` do Tk), sempre com o frame e o resultado mais novos.
+    Com `metrics` (metrics.Metrics), a captura e a inferência também registram seus percentis.
+    """
+
+    def __init__(self, source, process, queue_depth=1, max_frame_age=0.5, metrics=None):
+        self.capture_stats = StageStats("captura")
+        self.inference_stats = StageStats("inferência")
+        self.render_stats = StageStats("renderização")
+        self.worker = InferenceWorker(process, queue_depth, max_frame_age, self.inference_stats, metrics)
+        self.grabber = FrameGrabber(source, [self.worker.queue], self.capture_stats, metrics=metrics)
+        self._last_rendered = 0
+
+    def start(self):
+        self.worker.start()
+        self.grabber.start()
+        return self
+
+    def stop(self):
+        self.grabber.stop()
+        self.worker.stop()
+
+    def is_opened(self):
+        return self.grabber.is_opened()
+
+    def latest(self):
+        """Retorna (frame, resultado) mais recentes, ou (None, None) se não houver frame novo"""
+        frame = self.grabber.latest
+        if frame is None or frame.seq == self._last_rendered:
+            return None, None
+        skipped = frame.seq - self._last_rendered - 1
+        if self._last_rendered and skipped > 0:
+            self.render_stats.drop(skipped)
+        self._last_rendered = frame.seq
+        return frame, self.worker.result
+
+    def latency(self, frame):
+        """Latência de ponta a ponta (captura até agora) de um frame, em segundos"""
+        return time.perf_counter() - frame.timestamp
+
+    def stats(self):
+        return [self.capture_stats, self.inference_stats, self.render_stats]
@@ -0,0 +1,215 @@
+"""Processamento de vídeo sem interface: detecção e reconhecimento mais rápido que o tempo real
+
+Uma thread decodifica o vídeo, um pool de processos detecta e codifica blocos de frames e o
+processo principal identifica os rostos, grava o vídeo anotado e o log (na ordem original).
+
+Uso: python process_video.py gravacao.mp4 --output anotado.mp4 --log faces.csv --workers 8
+"""
+import argparse
+import collections
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from face_store import DEFAULT_STORE_PATH, open_store
+
+_worker_detector = None
+
+
+def init_video_worker(detector_name, cnn_batch):
+    """Inicializa o worker: carrega os modelos e o detector uma única vez"""
+    global _worker_detector
+    from detectors import get_detector
+    from inference_pool import init_worker
+
+    init_worker()
+    kwargs = {"batch_size": cnn_batch} if detector_name == "cnn" else {}
+    _worker_detector = get_detector(detector_name, **kwargs)
+
+
+def process_chunk(frames, scale, recognize):
+    """Detecta (em lote) e codifica os rostos de um bloco de frames BGR"""
+    from analysis import analyze
+    from scheduler import scale_locations
+
+    rgb_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+    if scale != 1.0:
+        small = [cv2.resize(frame, (0, 0), fx=scale, fy=scale) for frame in rgb_frames]
+        locations = [scale_locations(found, scale, frame.shape)
+                     for found, frame in zip(_worker_detector.detect_batch(small), rgb_frames)]
+    else:
+        locations = _worker_detector.detect_batch(rgb_frames)
+
+    results = []
+    for rgb_frame, frame_locations in zip(rgb_frames, locations):
+        result = analyze(rgb_frame, locations=frame_locations, encodings=recognize)
+        encodings = result.encodings if recognize else np.empty((len(result), 128), dtype=np.float32)
+        results.append((result.locations, encodings))
+    return results
+
+
+def decode_frames(capture, chunk_size, output, stop):
+    """Thread de decodificação: envia blocos de frames para a fila (limitada)"""
+    chunk = []
+    while not stop.is_set():
+        ret, frame = capture.read()
+        if not ret:
+            break
+        chunk.append(frame)
+        if len(chunk) == chunk_size:
+            output.put(chunk)
+            chunk = []
+    if chunk:
+        output.put(chunk)
+    output.put(None)
+
+
+def log_distance(distance):
+    """Distância arredondada, ou None sem galeria (nearest devolve inf quando ela está vazia)"""
+    if distance is None or not np.isfinite(distance):
+        return None
+    return round(float(distance), 4)
+
+
+class FaceLog:
+    """Log por frame em JSON ou CSV (pelo sufixo do arquivo)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.csv = path.lower().endswith(".csv")
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        if self.csv:
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(["frame", "time", "top", "right", "bottom", "left", "name", "distance"])
+        else:
+            self.file.write("[\n")
+            self.first = True
+
+    def write(self, index, timestamp, faces):
+        if self.csv:
+            for (top, right, bottom, left), name, distance in faces:
+                distance = log_distance(distance)
+                self.writer.writerow([index, f"{timestamp:.3f}", top, right, bottom, left, name or "",
+                                      "" if distance is None else f"{distance:.4f}"])
+            return
+        entry = {"frame": index, "time": round(timestamp, 3),
+                 "faces": [{"box": [int(v) for v in box], "name": name, "distance": log_distance(distance)}
+                           for box, name, distance in faces]}
+        self.file.write(("" if self.first else ",\n") + json.dumps(entry, ensure_ascii=False))
+        self.first = False
+
+    def close(self):
+        if not self.csv:
+            self.file.write("\n]\n")
+        self.file.close()
+
+
+def annotate(frame, faces):
+    for (top, right, bottom, left), name, _ in faces:
+        cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+        if name:
+            cv2.putText(frame, name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 0.5, (255, 255, 255), 1)
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("video")
+    parser.add_argument("--output", help="vídeo anotado (.mp4/.avi)")
+    parser.add_argument("--log", help="log por frame (.json ou .csv)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--detector", choices=["hog", "cnn", "ssd"], default="hog")
+    parser.add_argument("--cnn-batch", type=int, default=0,
+                        help="usa o detector CNN com batch_face_locations neste tamanho de lote")
+    parser.add_argument("--chunk", type=int, default=8, help="frames por tarefa enviada ao pool")
+    parser.add_argument("--scale", type=float, default=1.0, help="escala do frame para a detecção")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="galeria usada para identificar")
+    parser.add_argument("--tolerance", type=float, default=0.6)
+    parser.add_argument("--no-recognize", action="store_true", help="apenas detecção")
+    args = parser.parse_args()
+
+    detector_name = "cnn" if args.cnn_batch else args.detector
+    chunk_size = args.cnn_batch or args.chunk
+    recognize = not args.no_recognize
+    gallery = open_store(args.store).load_gallery() if recognize else None
+    if recognize and not len(gallery):
+        print(f"Galeria vazia em {args.store}: os rostos serão registrados sem identificação")
+
+    capture = cv2.VideoCapture(args.video)
+    if not capture.isOpened():
+        parser.error(f"não foi possível abrir {args.video}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    writer = None
+    if args.output:
+        fourcc = cv2.VideoWriter_fourcc(*("mp4v" if args.output.lower().endswith(".mp4") else "MJPG"))
+        writer = cv2.VideoWriter(args.output, fourcc, fps, (width, height))
+    log = FaceLog(args.log) if args.log else None
+
+    # Fila limitada: a decodificação não se adianta demais em relação ao pool
+    chunks = queue.Queue(maxsize=args.workers * 2)
+    stop = threading.Event()
+    decoder = threading.Thread(target=decode_frames, args=(capture, chunk_size, chunks, stop), daemon=True)
+
+    start = time.perf_counter()
+    frame_index = 0
+    faces_found = 0
+
+    def write_results(frames, results):
+        nonlocal frame_index, faces_found
+        for frame, (locations, encodings) in zip(frames, results):
+            if recognize and len(encodings) and len(gallery):
+                names, distances = gallery.nearest(encodings, args.tolerance)
+            else:
+                names, distances = [None] * len(locations), [None] * len(locations)
+            faces = list(zip([tuple(int(v) for v in box) for box in locations], names, distances))
+            faces_found += len(faces)
+            if writer:
+                writer.write(annotate(frame, faces))
+            if log:
+                log.write(frame_index, frame_index / fps, faces)
+            frame_index += 1
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_video_worker,
+                             initargs=(detector_name, args.cnn_batch or 32)) as executor:
+        decoder.start()
+        # Resultados consumidos na ordem de envio, preservando a ordem dos frames
+        in_flight = collections.deque()
+        try:
+            while True:
+                frames = chunks.get()
+                if frames is None:
+                    break
+                in_flight.append((frames, executor.submit(process_chunk, frames, args.scale, recognize)))
+                while in_flight and (len(in_flight) > args.workers * 2 or in_flight[0][1].done()):
+                    done_frames, future = in_flight.popleft()
+                    write_results(done_frames, future.result())
+            while in_flight:
+                done_frames, future = in_flight.popleft()
+                write_results(done_frames, future.result())
+        finally:
+            stop.set()
+
+    elapsed = time.perf_counter() - start
+    capture.release()
+    if writer:
+        writer.release()
+    if log:
+        log.close()
+
+    video_seconds = frame_index / fps
+    print(f"{frame_index} frames, {faces_found} rostos em {elapsed:.1f}s: "
+          f"{frame_index / elapsed:.1f} fps ({video_seconds / elapsed:.1f}x tempo real)")
+
+
+if __name__ == "__main__":
+    main()
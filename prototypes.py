@@ -0,0 +1,311 @@
+"""Galeria compacta por identidade: até k protótipos (medoides) por pessoa
+
+Cada clique em "Capturar e Gerar Encoding" acrescenta mais uma amostra da mesma pessoa, e a
+busca exata cresce com o número de amostras. Aqui cada pessoa vira no máximo k medoides
+(amostras reais, escolhidas por k-means), cada um com o raio das amostras que representa.
+A busca compara o rosto só com os protótipos; pela desigualdade triangular, o raio dá um
+limite inferior para a distância a qualquer amostra da pessoa, e as amostras brutas só são
+consultadas nos casos em que esse limite não decide (casos duvidosos). Assim o resultado é
+o mesmo da busca exata em todas as amostras.
+
+Uso: python prototypes.py compact --pickle known_faces.pkl --store known_faces --k 3
+     python prototypes.py report --store known_faces
+     python prototypes.py report --synthetic 1000x20
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from ann_index import kmeans
+from gallery import DEFAULT_TOLERANCE, ENCODING_DIM, FaceGallery
+
+PROTOTYPES_FILE = "prototypes.npz"
+
+
+def identity_prototypes(samples, k=3, seed=0):
+    """Até k medoides das amostras de uma pessoa e o raio (distância máxima) de cada um"""
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1, ENCODING_DIM)
+    if len(samples) <= k:
+        return samples.copy(), np.zeros(len(samples), dtype=np.float32)
+
+    centroids = kmeans(samples, k, iterations=10, seed=seed)
+    to_centroids = np.linalg.norm(samples[:, None, :] - centroids[None, :, :], axis=2)
+    medoids = samples[np.unique(np.argmin(to_centroids, axis=0))]
+
+    # Cada amostra fica com o medoide mais próximo; o raio cobre todas elas
+    to_medoids = np.linalg.norm(samples[:, None, :] - medoids[None, :, :], axis=2)
+    labels = np.argmin(to_medoids, axis=1)
+    radii = np.zeros(len(medoids), dtype=np.float32)
+    np.maximum.at(radii, labels, to_medoids[np.arange(len(samples)), labels])
+    return medoids, radii
+
+
+class _Index:
+    """Matrizes de busca de uma PrototypeGallery, montadas a partir de [(nome, (amostras, medoides, raios))]"""
+
+    def __init__(self, entries):
+        empty = np.empty((0, ENCODING_DIM), dtype=np.float32)
+        prototypes = [p for _, (_, p, _) in entries]
+        samples = [s for _, (s, _, _) in entries]
+        self.id_names = [name for name, _ in entries]
+
+        self.prototypes = FaceGallery(np.vstack(prototypes) if entries else empty,
+                                      [name for name, (_, p, _) in entries for _ in range(len(p))])
+        self.radii = np.concatenate([r for _, (_, _, r) in entries]) if entries else np.empty(0, np.float32)
+        self.proto_starts = np.cumsum([0] + [len(p) for p in prototypes[:-1]]).astype(np.int64)
+
+        self.samples = np.vstack(samples) if entries else empty
+        self.sample_owner = np.repeat(np.arange(len(entries)), [len(s) for s in samples]).astype(np.int64)
+        self.sample_names = np.array([name for name, (s, _, _) in entries for _ in range(len(s))], dtype=object)
+        self.sample_starts = np.cumsum([0] + [len(s) for s in samples]).astype(np.int64)
+
+    def bounds(self, dists):
+        """Por consulta e pessoa: limite superior (protótipo mais próximo) e inferior (protótipo - raio)"""
+        upper = np.minimum.reduceat(dists, self.proto_starts, axis=1)
+        lower = np.minimum.reduceat(np.maximum(dists - self.radii, 0.0), self.proto_starts, axis=1)
+        return upper, lower
+
+    def refine(self, query, lower, upper):
+        """Distância exata às amostras das pessoas cujo limite inferior ainda pode vencer"""
+        candidates = np.flatnonzero(lower <= upper)
+        idx = np.concatenate([np.arange(self.sample_starts[i], self.sample_starts[i + 1]) for i in candidates])
+        dists = np.linalg.norm(self.samples[idx] - query, axis=1)
+        j = int(np.argmin(dists))
+        return self.sample_owner[idx[j]], dists[j]
+
+
+class PrototypeGallery:
+    """Galeria com amostras por pessoa e protótipos (medoides + raio); mesma interface de busca do FaceGallery
+
+    `nearest(..., exact=True)` dá o mesmo nome que a busca exata em todas as amostras. A distância
+    devolvida é a do protótipo mais próximo (também uma amostra real), ou a exata quando o caso
+    foi refinado. Com `exact=False` usa só os protótipos.
+    """
+
+    def __init__(self, max_prototypes=3):
+        self.max_prototypes = max_prototypes
+        self.queries = 0
+        self.refined = 0  # consultas que precisaram das amostras brutas
+        self.source_rows = 0  # linhas do FaceStore já incluídas (ver load_prototype_gallery)
+        self._identities = {}  # nome -> (amostras, medoides, raios)
+        self._build()
+
+    @classmethod
+    def from_samples(cls, encodings, names, max_prototypes=3):
+        gallery = cls(max_prototypes)
+        gallery.extend(encodings, names)
+        return gallery
+
+    def __len__(self):
+        """Número de pessoas"""
+        return len(self._identities)
+
+    @property
+    def num_samples(self):
+        return len(self._index.samples)
+
+    @property
+    def num_prototypes(self):
+        return len(self._index.prototypes)
+
+    @property
+    def names(self):
+        """Nome de cada amostra (na ordem interna, agrupadas por pessoa)"""
+        return self._index.sample_names
+
+    def add(self, encoding, name):
+        self.extend([encoding], [name])
+
+    def extend(self, encodings, names):
+        """Inclui amostras; só os protótipos das pessoas afetadas são recalculados"""
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if len(names) != len(encodings):
+            raise ValueError("encodings e names devem ter o mesmo tamanho")
+        grouped = {}
+        for encoding, name in zip(encodings, names):
+            grouped.setdefault(name, []).append(encoding)
+        for name, new in grouped.items():
+            old = self._identities.get(name)
+            samples = np.vstack([old[0], new]) if old is not None else np.asarray(new)
+            self._identities[name] = (samples,) + identity_prototypes(samples, self.max_prototypes)
+        self._build()
+
+    def _build(self):
+        """Monta as matrizes contíguas (protótipos e amostras agrupados por pessoa) e troca de uma vez
+
+        A busca lê `self._index` uma única vez, então um add() concorrente (ex.: o botão de captura
+        enquanto a thread de inferência busca) nunca mistura matrizes antigas e novas.
+        """
+        self._index = _Index(list(self._identities.items()))
+
+    def nearest(self, face_encodings, tolerance=DEFAULT_TOLERANCE, unknown=None, exact=True):
+        """Retorna (nomes, distâncias) como FaceGallery.nearest, buscando primeiro nos protótipos"""
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if len(queries) == 0:
+            return [], np.empty(0, dtype=np.float32)
+        index = self._index
+        if not index.id_names:
+            return [unknown] * len(queries), np.full(len(queries), np.inf, dtype=np.float32)
+
+        upper, lower = index.bounds(index.prototypes.distances(queries))
+        rows = np.arange(len(queries))
+        best = np.argmin(upper, axis=1)
+        best_dist = upper[rows, best]
+        self.queries += len(queries)
+
+        if exact:
+            # Duvidoso: outra pessoa pode ter uma amostra mais perto, ou a tolerância não está decidida
+            others = lower.copy()
+            others[rows, best] = np.inf
+            doubtful = (others.min(axis=1) < best_dist) | ((lower[rows, best] <= tolerance) & (best_dist > tolerance))
+            for row in np.flatnonzero(doubtful):
+                best[row], best_dist[row] = index.refine(queries[row], lower[row], best_dist[row])
+            self.refined += int(doubtful.sum())
+
+        names = [index.id_names[i] if d <= tolerance else unknown for i, d in zip(best, best_dist)]
+        return names, best_dist
+
+    def save(self, path):
+        index = self._index
+        np.savez(
+            path,
+            params=np.array([self.max_prototypes, self.source_rows]),
+            names=np.array([str(n) for n in index.id_names]),
+            samples=index.samples,
+            sample_starts=index.sample_starts,
+            prototypes=index.prototypes.encodings,
+            proto_starts=np.append(index.proto_starts, len(index.prototypes)),
+            radii=index.radii,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            max_prototypes, source_rows = (int(v) for v in data["params"])
+            gallery = cls(max_prototypes)
+            gallery.source_rows = source_rows
+            s, p = data["sample_starts"], data["proto_starts"]
+            for i, name in enumerate(data["names"]):
+                gallery._identities[str(name)] = (data["samples"][s[i]:s[i + 1]],
+                                                  data["prototypes"][p[i]:p[i + 1]], data["radii"][p[i]:p[i + 1]])
+        gallery._build()
+        return gallery
+
+
+def load_prototype_gallery(store, max_prototypes=3):
+    """Galeria de protótipos do FaceStore: usa o prototypes.npz compactado e inclui só as linhas novas"""
+    path = os.path.join(store.path, PROTOTYPES_FILE)
+    encodings, records = store.load() if store.exists() else (np.empty((0, ENCODING_DIM), np.float32), [])
+    gallery = None
+    if os.path.exists(path):
+        gallery = PrototypeGallery.load(path)
+        if gallery.source_rows > len(records):
+            # Galeria recriada depois da compactação
+            gallery = None
+    if gallery is None:
+        gallery = PrototypeGallery(max_prototypes)
+    new = slice(gallery.source_rows, len(records))
+    if len(records[new]):
+        gallery.extend(encodings[new], [r["name"] for r in records[new]])
+    gallery.source_rows = len(records)
+    return gallery
+
+
+def compact(store, max_prototypes=3):
+    """Recalcula os protótipos de toda a galeria e grava em <store>/prototypes.npz"""
+    encodings, records = store.load()
+    gallery = PrototypeGallery.from_samples(encodings, [r["name"] for r in records], max_prototypes)
+    gallery.source_rows = len(records)
+    gallery.save(os.path.join(store.path, PROTOTYPES_FILE))
+    return gallery
+
+
+def synthetic_identities(people, samples, seed=0):
+    """Amostras sintéticas: centros a ~1.0 de distância entre pessoas, amostras a ~0.3 do centro"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=1.0 / np.sqrt(2 * ENCODING_DIM), size=(people, ENCODING_DIM))
+    noise = rng.normal(scale=0.3 / np.sqrt(ENCODING_DIM), size=(people, samples, ENCODING_DIM))
+    encodings = (centers[:, None, :] + noise).reshape(-1, ENCODING_DIM).astype(np.float32)
+    names = [f"id{i}" for i in range(people) for _ in range(samples)]
+    return encodings, names
+
+
+def report(encodings, names, max_prototypes=3, holdout=0.2, tolerance=DEFAULT_TOLERANCE, seed=0):
+    """Compara busca exata em todas as amostras com os protótipos (exata e só protótipos)"""
+    rng = np.random.default_rng(seed)
+    names = np.asarray(names, dtype=object)
+    test = rng.random(len(names)) < holdout
+    # Pessoas com todas as amostras separadas para teste fazem o papel de desconhecidos
+    enrolled = set(names[~test])
+    expected = [n if n in enrolled else None for n in names[test]]
+    queries = encodings[test]
+    if not len(queries) or test.all():
+        print(f"galeria pequena demais para o relatório ({len(names)} amostras); use --synthetic")
+        return
+
+    start = time.perf_counter()
+    exact = FaceGallery(encodings[~test], list(names[~test]))
+    build_exact = time.perf_counter() - start
+    start = time.perf_counter()
+    prototypes = PrototypeGallery.from_samples(encodings[~test], list(names[~test]), max_prototypes)
+    build_proto = time.perf_counter() - start
+
+    print(f"{len(prototypes)} pessoas, {prototypes.num_samples} amostras -> {prototypes.num_prototypes} protótipos "
+          f"(k={max_prototypes}); {len(queries)} consultas")
+    print(f"montagem: exata {build_exact * 1000:.1f} ms, protótipos {build_proto * 1000:.1f} ms")
+
+    baseline_names = None
+    for label, search in (("exata (amostras)", lambda q: exact.nearest(q, tolerance)),
+                          ("protótipos + refino", lambda q: prototypes.nearest(q, tolerance)),
+                          ("só protótipos", lambda q: prototypes.nearest(q, tolerance, exact=False))):
+        refined_before = prototypes.refined
+        start = time.perf_counter()
+        found = []
+        for i in range(0, len(queries), 16):
+            found.extend(search(queries[i:i + 16])[0])
+        elapsed = time.perf_counter() - start
+        accuracy = np.mean([f == e for f, e in zip(found, expected)]) if expected else 0.0
+        agreement = np.mean([f == b for f, b in zip(found, baseline_names)]) if baseline_names else 1.0
+        baseline_names = baseline_names or found
+        refined = prototypes.refined - refined_before
+        extra = f", refino em {100.0 * refined / max(len(queries), 1):.1f}%" if refined else ""
+        print(f"{label:20s}: {len(queries) / max(elapsed, 1e-9):9.0f} consultas/s, acerto {accuracy:.2%}, "
+              f"igual à exata {agreement:.2%}{extra}")
+
+
+def main():
+    from face_store import DEFAULT_STORE_PATH, LEGACY_PICKLE_PATH, FaceStore, open_store
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact_cmd = sub.add_parser("compact", help="grava os protótipos de toda a galeria")
+    compact_cmd.add_argument("--pickle", default=LEGACY_PICKLE_PATH, help="migrado para --store se preciso")
+    compact_cmd.add_argument("--store", default=DEFAULT_STORE_PATH)
+    compact_cmd.add_argument("--k", type=int, default=3, help="protótipos por pessoa")
+    report_cmd = sub.add_parser("report", help="velocidade e acerto: exata x protótipos")
+    report_cmd.add_argument("--store", default=DEFAULT_STORE_PATH)
+    report_cmd.add_argument("--synthetic", help="PESSOASxAMOSTRAS sintéticas em vez da galeria (ex.: 1000x20)")
+    report_cmd.add_argument("--k", type=int, default=3)
+    report_cmd.add_argument("--holdout", type=float, default=0.2, help="fração das amostras usada como consulta")
+    report_cmd.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        store = open_store(args.store, args.pickle)
+        gallery = compact(store, args.k)
+        print(f"{len(gallery)} pessoas, {gallery.num_samples} amostras -> {gallery.num_prototypes} protótipos "
+              f"em {os.path.join(store.path, PROTOTYPES_FILE)}")
+    else:
+        if args.synthetic:
+            people, samples = (int(v) for v in args.synthetic.lower().split("x"))
+            encodings, names = synthetic_identities(people, samples)
+        else:
+            encodings, records = FaceStore(args.store).load()
+            encodings, names = np.asarray(encodings), [r["name"] for r in records]
+        report(encodings, names, args.k, args.holdout, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
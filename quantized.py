@@ -0,0 +1,200 @@
+"""Galeria comprimida: encodings em float16 ou int8 (escala por dimensão)
+
+As distâncias são calculadas direto sobre os códigos, em blocos (só um bloco é convertido
+para float32 por vez), e os `rerank` melhores candidatos de cada rosto podem ser
+recalculados em precisão total a partir de `full`, por exemplo o memmap do FaceStore, que
+fica no disco e só tem lidas as linhas pedidas.
+
+Memória por rosto: float64 1024 B, float32 512 B, float16 256 B, int8 128 B (+ 4 B de norma).
+
+Uso: python quantized.py --store known_faces
+     python quantized.py --synthetic 200000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from gallery import DEFAULT_TOLERANCE, ENCODING_DIM, FaceGallery
+
+MODES = ("float16", "int8")
+
+
+class QuantizedGallery:
+    """Mesma interface de busca do FaceGallery (nearest, top_k, names, len) sobre códigos comprimidos
+
+    Somente leitura: para incluir rostos, monte outra (o StoreWatcher já faz isso quando o
+    FaceStore muda).
+    """
+
+    def __init__(self, encodings, names, mode="int8", rerank=10, full=None, chunk=8192):
+        if mode not in MODES:
+            raise ValueError(f"modo desconhecido: {mode} (opções: {', '.join(MODES)})")
+        if len(names) != len(encodings):
+            raise ValueError("encodings e names devem ter o mesmo tamanho")
+        self.mode = mode
+        self.rerank = rerank if full is not None else 0
+        self.full = full
+        self.chunk = chunk
+        self._names = np.array(list(names), dtype=object)
+
+        self.scale = np.ones(ENCODING_DIM, dtype=np.float32)
+        self.codes = np.empty((len(encodings), ENCODING_DIM), dtype=np.int8 if mode == "int8" else np.float16)
+        self._sq_norms = np.empty(len(encodings), dtype=np.float32)
+        if mode == "int8" and len(encodings):
+            # Escala simétrica por dimensão: o maior |valor| de cada dimensão vira 127
+            peak = np.zeros(ENCODING_DIM, dtype=np.float32)
+            for start in range(0, len(encodings), chunk):
+                block = np.abs(np.asarray(encodings[start:start + chunk], dtype=np.float32))
+                np.maximum(peak, block.max(axis=0), out=peak)
+            self.scale = np.maximum(peak, 1e-6) / 127.0
+
+        # Quantiza em blocos, para não materializar a galeria inteira em float32
+        for start in range(0, len(encodings), chunk):
+            block = np.asarray(encodings[start:start + chunk], dtype=np.float32)
+            if mode == "int8":
+                codes = np.clip(np.rint(block / self.scale), -127, 127).astype(np.int8)
+            else:
+                codes = block.astype(np.float16)
+            self.codes[start:start + len(block)] = codes
+            # Norma do vetor reconstruído, coerente com o produto interno calculado na busca
+            decoded = self._decode(codes)
+            self._sq_norms[start:start + len(block)] = np.einsum("ij,ij->i", decoded, decoded)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def names(self):
+        return self._names
+
+    @property
+    def nbytes(self):
+        """Memória residente da galeria (códigos, normas e escala; sem contar `full`)"""
+        return self.codes.nbytes + self._sq_norms.nbytes + self.scale.nbytes
+
+    def _decode(self, codes):
+        if self.mode == "int8":
+            return codes.astype(np.float32) * self.scale
+        return codes.astype(np.float32)
+
+    def distances(self, face_encodings):
+        """Distâncias (M x N) calculadas sobre os códigos: |q|² + |c|² - 2 q·(escala ∘ c)"""
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        out = np.empty((len(queries), len(self)), dtype=np.float32)
+        if not len(queries) or not len(self):
+            return out
+        # A escala do int8 vai na consulta, e o bloco de códigos só é convertido de tipo
+        scaled = queries * self.scale if self.mode == "int8" else queries
+        q_sq = np.einsum("ij,ij->i", queries, queries)
+        for start in range(0, len(self), self.chunk):
+            block = self.codes[start:start + self.chunk].astype(np.float32)
+            d = out[:, start:start + len(block)]
+            np.matmul(scaled, block.T, out=d)
+            d *= -2.0
+            d += q_sq[:, None]
+            d += self._sq_norms[None, start:start + len(block)]
+        np.maximum(out, 0.0, out=out)
+        return np.sqrt(out, out=out)
+
+    def top_k(self, face_encodings, k=5):
+        """(índices, distâncias) dos k mais próximos; com `rerank`, os candidatos são reordenados em precisão total"""
+        dists = self.distances(face_encodings)
+        size = dists.shape[1]
+        pool = min(max(k, self.rerank), size)
+        if pool == 0:
+            shape = (dists.shape[0], 0)
+            return np.empty(shape, dtype=np.int64), np.empty(shape, dtype=np.float32)
+
+        idx = np.argpartition(dists, pool - 1, axis=1)[:, :pool] if pool < size else np.tile(np.arange(size), (len(dists), 1))
+        part = np.take_along_axis(dists, idx, axis=1)
+        if self.rerank:
+            queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+            # Lê do `full` só as linhas candidatas (ordenadas, o que ajuda um memmap)
+            rows = np.unique(idx)
+            exact = np.asarray(self.full[rows], dtype=np.float32)
+            pos = np.searchsorted(rows, idx)
+            part = np.linalg.norm(exact[pos] - queries[:, None, :], axis=2).astype(np.float32)
+        order = np.argsort(part, axis=1)[:, :min(k, size)]
+        return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+    def nearest(self, face_encodings, tolerance=DEFAULT_TOLERANCE, unknown=None):
+        """Retorna (nomes, distâncias) do vizinho mais próximo, como FaceGallery.nearest"""
+        idx, dists = self.top_k(face_encodings, k=1)
+        if idx.shape[0] == 0:
+            return [], np.empty(0, dtype=np.float32)
+        if idx.shape[1] == 0:
+            return [unknown] * idx.shape[0], np.full(idx.shape[0], np.inf, dtype=np.float32)
+        return [self._names[i] if d <= tolerance else unknown for i, d in zip(idx[:, 0], dists[:, 0])], dists[:, 0]
+
+
+def report(encodings, names, queries, tolerance=DEFAULT_TOLERANCE, rerank=10):
+    """Memória, velocidade e concordância com a busca em float64 (o known_faces.pkl original)"""
+    baseline = np.asarray(encodings, dtype=np.float64)
+    names = np.asarray(names, dtype=object)
+
+    def exact64(q):
+        d = np.sqrt(np.maximum((q.astype(np.float64) ** 2).sum(1)[:, None] + (baseline ** 2).sum(1)[None, :]
+                               - 2.0 * q.astype(np.float64) @ baseline.T, 0.0))
+        i = np.argmin(d, axis=1)
+        return i, d[np.arange(len(i)), i]
+
+    candidates = [("float64 (base)", baseline.nbytes, lambda q: exact64(q))]
+    gallery32 = FaceGallery(encodings, names)
+    candidates.append(("float32", gallery32.encodings.nbytes + len(gallery32) * 4,
+                       lambda q: (lambda d: (np.argmin(d, 1), d.min(1)))(gallery32.distances(q))))
+    for mode in MODES:
+        for r in (0, rerank):
+            g = QuantizedGallery(encodings, names, mode, rerank=r, full=encodings if r else None)
+            label = f"{mode}" + (f" + rerank {r}" if r else "")
+            candidates.append((label, g.nbytes, lambda q, g=g: (lambda t: (t[0][:, 0], t[1][:, 0]))(g.top_k(q, 1))))
+
+    base_idx, base_d = None, None
+    print(f"{len(encodings)} rostos, {len(queries)} consultas")
+    print(f"{'representação':22s} {'memória':>10s} {'x menor':>8s} {'consultas/s':>12s} {'nome igual':>12s} "
+          f"{'decisão igual':>14s} {'erro máx.':>10s}")
+    for label, nbytes, search in candidates:
+        start = time.perf_counter()
+        results = [search(queries[i:i + 16]) for i in range(0, len(queries), 16)]
+        elapsed = time.perf_counter() - start
+        idx = np.concatenate([r[0] for r in results])
+        d = np.concatenate([r[1] for r in results])
+        if base_idx is None:
+            base_idx, base_d, base_bytes = idx, d, nbytes
+        same = np.mean(names[idx] == names[base_idx])
+        decision = np.mean((d <= tolerance) == (base_d <= tolerance))
+        error = np.max(np.abs(d - base_d)) if len(d) else 0.0
+        print(f"{label:22s} {nbytes / 2**20:8.1f}MB {base_bytes / nbytes:7.1f}x {len(queries) / elapsed:12.0f} "
+              f"{same:12.2%} {decision:14.2%} {error:10.4f}")
+
+
+def main():
+    from face_store import DEFAULT_STORE_PATH, FaceStore
+    from prototypes import synthetic_identities
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--synthetic", type=int, help="galeria sintética com este número de rostos")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--rerank", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        encodings, names = synthetic_identities(args.synthetic // 10 or 1, 10)
+    else:
+        encodings, records = FaceStore(args.store).load()
+        names = [r["name"] for r in records]
+    encodings = np.asarray(encodings, dtype=np.float32)
+    if not len(encodings):
+        raise SystemExit("galeria vazia; use --synthetic")
+
+    rng = np.random.default_rng(0)
+    picked = rng.choice(len(encodings), size=args.queries)
+    # Consultas: rostos cadastrados com ruído (mesma pessoa, outra foto)
+    queries = encodings[picked] + rng.normal(scale=0.2 / np.sqrt(ENCODING_DIM), size=(args.queries, ENCODING_DIM))
+    report(encodings, names, queries.astype(np.float32), args.tolerance, args.rerank)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import time
+
+import cv2
+
+
+def scale_locations(face_locations, scale, shape=None):
+    """Converte caixas (top, right, bottom, left) de um frame reduzido para o frame original"""
+    scaled = []
+    for top, right, bottom, left in face_locations:
+        top, right, bottom, left = (int(round(v / scale)) for v in (top, right, bottom, left))
+        if shape is not None:
+            h, w = shape[:2]
+            top, bottom = max(top, 0), min(bottom, h)
+            left, right = max(left, 0), min(right, w)
+        scaled.append((top, right, bottom, left))
+    return scaled
+
+
+class DetectionScheduler:
+    """Agenda a detecção de rostos nos loops ao vivo
+
+    - detecta em uma cópia reduzida do frame (`scale`) e devolve as caixas na escala original
+    - roda a detecção a cada `skip + 1` frames, reaproveitando as últimas caixas nos demais
+    - com `target_fps`, ajusta escala e salto conforme o custo medido de cada frame
+    """
+
+    def __init__(self, detect=None, scale=0.5, skip=0, target_fps=None,
+                 min_scale=0.25, max_scale=1.0, max_skip=5, smoothing=0.2):
+        if detect is None:
+            # Backend escolhido pela configuração (FACE_DETECTOR)
+            from detectors import get_detector
+            detect = get_detector()
+        self.detect = detect
+        self.scale = scale
+        self.skip = skip
+        self.target_fps = target_fps
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.max_skip = max_skip
+        self.smoothing = smoothing
+
+        self.last_locations = []
+        self.fresh = False  # True se as caixas do último frame vieram de uma detecção nova
+        self.frame_time = None  # média móvel exponencial do intervalo entre frames (s)
+        self.detect_time = None  # média móvel exponencial do custo de uma detecção (s)
+        self._frame_index = 0
+        self._last_call = None
+
+    def locations(self, frame):
+        """Retorna as caixas de rosto do frame (RGB ou BGR, conforme o detector)"""
+        now = time.perf_counter()
+        if self._last_call is not None:
+            self.frame_time = self._ema(self.frame_time, now - self._last_call)
+        self._last_call = now
+
+        self.fresh = self._frame_index % (self.skip + 1) == 0
+        self._frame_index += 1
+        if self.fresh:
+            start = time.perf_counter()
+            self.last_locations = self._detect_scaled(frame)
+            self.detect_time = self._ema(self.detect_time, time.perf_counter() - start)
+            self._adapt()
+        return self.last_locations
+
+    __call__ = locations
+
+    def _detect_scaled(self, frame):
+        if self.scale == 1.0:
+            return list(self.detect(frame))
+        small = cv2.resize(frame, (0, 0), fx=self.scale, fy=self.scale)
+        return scale_locations(self.detect(small), self.scale, frame.shape)
+
+    def _ema(self, current, value):
+        return value if current is None else current + self.smoothing * (value - current)
+
+    def _adapt(self):
+        """Controlador simples: reduz escala e depois aumenta o salto se o frame estiver acima do orçamento"""
+        if not self.target_fps or self.frame_time is None:
+            return
+        budget = 1.0 / self.target_fps
+
+        if self.frame_time > budget * 1.1:
+            if self.scale > self.min_scale:
+                self.scale = max(self.min_scale, round(self.scale * 0.85, 3))
+            elif self.skip < self.max_skip:
+                self.skip += 1
+        elif self.frame_time < budget * 0.7:
+            if self.skip > 0:
+                self.skip -= 1
+            elif self.scale < self.max_scale:
+                self.scale = min(self.max_scale, round(self.scale / 0.85, 3))
+
+    def __str__(self):
+        detect_ms = (self.detect_time or 0.0) * 1000.0
+        fps = 1.0 / self.frame_time if self.frame_time else 0.0
+        return f"detecção: escala {self.scale:.2f}, 1 a cada {self.skip + 1}, {detect_ms:.0f} ms, {fps:.1f} fps"
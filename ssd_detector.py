@@ -0,0 +1,83 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# Modelo SSD (ResNet-10, 300x300) do OpenCV; os arquivos ficam em outros/
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outros")
+PROTOTXT = os.path.join(MODEL_DIR, "deploy.prototxt.txt")
+WEIGHTS = os.path.join(MODEL_DIR, "res10_300x300_ssd_iter_140000.caffemodel")
+
+INPUT_SIZE = (300, 300)
+MEAN = (104.0, 177.0, 123.0)
+
+_nets = {}
+_nets_lock = threading.Lock()
+
+
+def load_ssd_net(prototxt=PROTOTXT, weights=WEIGHTS):
+    """Carrega a rede Caffe uma única vez por processo e compartilha entre os detectores"""
+    key = (os.path.abspath(prototxt), os.path.abspath(weights))
+    with _nets_lock:
+        if key not in _nets:
+            _nets[key] = (cv2.dnn.readNetFromCaffe(prototxt, weights), threading.Lock())
+        return _nets[key]
+
+
+class SSDDetector:
+    """Detector de rostos SSD com inferência em lote e pós-processamento vetorizado
+
+    Os resultados de cada frame são (caixas, confianças), com caixas (startX, startY, endX, endY)
+    em pixels do frame original.
+    """
+
+    def __init__(self, confidence=0.5, nms_threshold=0.4, prototxt=PROTOTXT, weights=WEIGHTS):
+        self.confidence = confidence
+        self.nms_threshold = nms_threshold
+        self.net, self._lock = load_ssd_net(prototxt, weights)
+
+    def forward(self, frames):
+        """Uma única passada da rede para todos os frames (BGR)"""
+        blob = cv2.dnn.blobFromImages(frames, 1.0, INPUT_SIZE, MEAN, swapRB=False, crop=False)
+        # A mesma rede é compartilhada entre threads; forward não é reentrante
+        with self._lock:
+            self.net.setInput(blob)
+            return self.net.forward()
+
+    def detect_batch(self, frames):
+        """Detecta rostos em vários frames de uma vez; retorna uma lista de (caixas, confianças)"""
+        if len(frames) == 0:
+            return []
+        detections = self.forward(frames)[0, 0]  # (N, 7): image_id, label, conf, x1, y1, x2, y2
+
+        detections = detections[detections[:, 2] > self.confidence]
+        image_ids = detections[:, 0].astype(np.int64)
+
+        results = []
+        for i, frame in enumerate(frames):
+            h, w = frame.shape[:2]
+            rows = detections[image_ids == i]
+            boxes = np.clip(rows[:, 3:7], 0.0, 1.0) * np.array([w, h, w, h], dtype=np.float32)
+            boxes = boxes.astype(np.int32)
+            confidences = rows[:, 2]
+
+            keep = self._nms(boxes, confidences)
+            results.append((boxes[keep], confidences[keep]))
+        return results
+
+    def detect(self, frame):
+        """Detecta rostos em um único frame"""
+        return self.detect_batch([frame])[0]
+
+    def _nms(self, boxes, confidences):
+        if len(boxes) < 2 or not self.nms_threshold:
+            return np.arange(len(boxes))
+        rects = np.column_stack([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]]).tolist()
+        keep = cv2.dnn.NMSBoxes(rects, confidences.tolist(), self.confidence, self.nms_threshold)
+        return np.asarray(keep, dtype=np.int64).reshape(-1)
+
+
+def to_locations(boxes):
+    """Converte caixas (startX, startY, endX, endY) para (top, right, bottom, left)"""
+    return [(int(y1), int(x2), int(y2), int(x1)) for x1, y1, x2, y2 in boxes]
@@ -0,0 +1,89 @@
+"""Inicialização rápida: marcos de tempo desde o início do processo e aquecimento dos modelos
+
+Importe este módulo primeiro no ponto de entrada, para que o relógio comece o mais cedo
+possível. Só usa a biblioteca padrão; os modelos (face_recognition/dlib) são carregados
+pelo aquecimento, numa thread, enquanto a janela ou o servidor sobem.
+
+    from startup import start_warmup, timer
+    warmup = start_warmup()
+    ...
+    timer.mark("primeira janela")
+"""
+import threading
+import time
+
+PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    """Registra cada marco uma única vez (ms desde PROCESS_START) e o imprime"""
+
+    def __init__(self, start=PROCESS_START, verbose=True):
+        self.start = start
+        self.verbose = verbose
+        self.marks = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name):
+        with self._lock:
+            if name in self.marks:
+                return self.marks[name]
+            elapsed = (time.perf_counter() - self.start) * 1000.0
+            self.marks[name] = elapsed
+        if self.verbose:
+            print(f"[inicialização] {name}: {elapsed:.0f} ms")
+        return elapsed
+
+    def report(self):
+        return {name: round(ms, 1) for name, ms in self.marks.items()}
+
+
+timer = StartupTimer()
+
+
+def warm_up(detector=None):
+    """Inferência de teste: importa face_recognition, carrega os modelos e roda detecção e encoding
+
+    `detector` (detectors.FaceDetector) também é aquecido; sem ele, usa o HOG do face_recognition.
+    """
+    import numpy as np
+    from analysis import encode_faces
+
+    dummy = np.zeros((120, 120, 3), dtype=np.uint8)
+    if detector is None:
+        import face_recognition
+        face_recognition.face_locations(dummy)
+    else:
+        detector.detect(dummy)
+    encode_faces(dummy, [(10, 110, 110, 10)])
+
+
+class Warmup(threading.Thread):
+    """Aquecimento em segundo plano; `wait()` bloqueia até terminar (ou falhar)"""
+
+    def __init__(self, detector=None, name="modelos carregados"):
+        super().__init__(daemon=True)
+        self.detector = detector
+        self.mark_name = name
+        self.done = threading.Event()
+        self.error = None
+
+    def run(self):
+        try:
+            warm_up(self.detector)
+            timer.mark(self.mark_name)
+        except Exception as exc:
+            # O primeiro frame carrega os modelos de qualquer forma; só registra
+            self.error = exc
+            print(f"Falha no aquecimento: {exc}")
+        finally:
+            self.done.set()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+
+def start_warmup(detector=None):
+    warmup = Warmup(detector)
+    warmup.start()
+    return warmup
@@ -0,0 +1,95 @@
+import asyncio
+import collections
+import time
+
+from metrics import LatencyRing
+
+
+class LatestFrame:
+    """Vaga de um único frame, no event loop: um frame novo substitui o que ainda não foi processado
+
+    Assim a fila de uma conexão nunca cresce: se o cliente envia mais rápido do que o servidor
+    processa, os frames intermediários são descartados (e contados em `dropped`).
+    """
+
+    def __init__(self):
+        self.item = None
+        self.dropped = 0
+        self.closed = False
+        self._event = asyncio.Event()
+
+    def put(self, item):
+        if self.item is not None:
+            self.dropped += 1
+        self.item = item
+        self._event.set()
+
+    def close(self):
+        self.closed = True
+        self._event.set()
+
+    async def get(self):
+        """Próximo frame; None depois de `close` (o frame pendente, se houver, ainda é entregue)"""
+        while self.item is None:
+            if self.closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        item, self.item = self.item, None
+        return item
+
+
+class StreamSession:
+    """Estado de uma conexão de streaming: vaga do frame mais recente, contadores e latência
+
+    `receive(data)` é chamado a cada frame recebido; `results()` processa um frame por vez com
+    `process(data) -> dict` e produz o resultado acrescido de número do frame, latência (desde
+    a chegada do frame) e estatísticas da conexão.
+    """
+
+    def __init__(self, process, size=256, fps_window=30):
+        self.process = process
+        self.slot = LatestFrame()
+        self.received = 0
+        self.processed = 0
+        self.errors = 0
+        self.latency = LatencyRing("stream", size)
+        self.started = time.perf_counter()
+        self._done = collections.deque(maxlen=fps_window)
+
+    def receive(self, data):
+        self.received += 1
+        self.slot.put((self.received, time.perf_counter(), data))
+
+    def close(self):
+        self.slot.close()
+
+    async def results(self):
+        while True:
+            item = await self.slot.get()
+            if item is None:
+                return
+            seq, received_at, data = item
+            try:
+                result = await self.process(data)
+            except Exception as exc:
+                self.errors += 1
+                result = {"error": getattr(exc, "detail", None) or f"{type(exc).__name__}: {exc}"}
+            now = time.perf_counter()
+            self.processed += 1
+            self.latency.record(now - received_at)
+            self._done.append(now)
+            yield {"seq": seq, **result, "latency_ms": round((now - received_at) * 1000.0, 1), "stats": self.stats()}
+
+    @property
+    def fps(self):
+        """Frames processados por segundo, na janela recente"""
+        if len(self._done) < 2:
+            return 0.0
+        return (len(self._done) - 1) / max(self._done[-1] - self._done[0], 1e-6)
+
+    def stats(self):
+        p50, p95, p99 = self.latency.percentiles()
+        return {"received": self.received, "processed": self.processed, "dropped": self.slot.dropped,
+                "errors": self.errors, "fps": round(self.fps, 1), "uptime_s": round(time.perf_counter() - self.started, 1),
+                "p50_ms": round(p50 * 1000.0, 1), "p95_ms": round(p95 * 1000.0, 1), "p99_ms": round(p99 * 1000.0, 1)}
@@ -1,21 +1,25 @@
+from startup import start_warmup, timer
+import threading
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 import cv2
-import face_recognition
 import numpy as np
-from PIL import Image, ImageTk
-import os
-import pickle
+from analysis import encode_faces
+from detectors import get_detector
+from face_store import open_store
+from prototypes import load_prototype_gallery
+from video_view import VideoView
 
 class FacialRecognitionApp:
     def __init__(self, window):
         self.window = window
         self.window.title("Reconhecimento Facial")
         
-        self.video_capture = cv2.VideoCapture(0)
+        # Câmera, galeria e modelos sobem em segundo plano; a janela aparece antes
+        self.video_capture = None
         
-        self.canvas = tk.Canvas(window, width=640, height=480)
-        self.canvas.pack()
+        self.view = VideoView(window, width=640, height=480)
+        self.view.pack()
         
         self.btn_capture = tk.Button(window, text="Capturar e Gerar Encoding", command=self.capture_and_encode)
         self.btn_capture.pack(side=tk.LEFT, padx=10)
@@ -23,39 +27,62 @@ class FacialRecognitionApp:
         self.btn_detect = tk.Button(window, text="Detectar Faces", command=self.detect_faces)
         self.btn_detect.pack(side=tk.RIGHT, padx=10)
         
-        self.known_face_encodings = []
-        self.known_face_names = []
+        # Detector escolhido pela configuração (FACE_DETECTOR=hog|cnn|ssd)
+        self.detector = get_detector()
         
-        self.load_known_faces()
+        self.store = open_store()
+        self.gallery = None
+        self.warmup = start_warmup(self.detector)
+        threading.Thread(target=self.load_resources, daemon=True).start()
         
+        self.window.after(0, timer.mark, "primeira janela")
         self.update()
     
+    def load_resources(self):
+        self.video_capture = cv2.VideoCapture(0)
+        timer.mark("câmera aberta")
+        self.load_known_faces()
+        timer.mark("galeria carregada")
+    
+    def read_frame(self):
+        if self.video_capture is None:
+            return False, None
+        return self.video_capture.read()
+    
+    def ready(self):
+        # Os botões ficam disponíveis quando a galeria estiver carregada
+        if self.gallery is None:
+            messagebox.showinfo("Aguarde", "Carregando a galeria de rostos conhecidos")
+            return False
+        return True
+    
     def update(self):
-        ret, frame = self.video_capture.read()
+        ret, frame = self.read_frame()
         if ret:
-            self.photo = ImageTk.PhotoImage(image=Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
-            self.canvas.create_image(0, 0, image=self.photo, anchor=tk.NW)
+            self.view.show(frame)
+            timer.mark("primeiro frame")
         self.window.after(15, self.update)
     
     def capture_and_encode(self):
-        ret, frame = self.video_capture.read()
+        if not self.ready():
+            return
+        ret, frame = self.read_frame()
         if ret:
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(rgb_frame)
+            face_locations = self.detector.detect(rgb_frame)
             if face_locations:
                 top, right, bottom, left = face_locations[0]
                 face_image = frame[top:bottom, left:right]
                 cv2.imwrite("captured_face.jpg", face_image)
                 
-                face_encoding = face_recognition.face_encodings(rgb_frame, face_locations)[0]
+                face_encoding = encode_faces(rgb_frame, face_locations[:1])[0]
                 
                 # Abrir modal para inserir o nome
                 name = self.get_person_name()
                 if name:
-                    self.known_face_encodings.append(face_encoding)
-                    self.known_face_names.append(name)
+                    self.gallery.add(face_encoding, name)
                     
-                    self.save_known_faces()
+                    self.save_known_face(face_encoding, name)
                     
                     messagebox.showinfo("Sucesso", f"Rosto capturado e encoding gerado para {name}")
                 else:
@@ -67,20 +94,19 @@ class FacialRecognitionApp:
         return simpledialog.askstring("Nome da Pessoa", "Digite o nome da pessoa capturada:")
     
     def detect_faces(self):
-        ret, frame = self.video_capture.read()
+        if not self.ready():
+            return
+        ret, frame = self.read_frame()
         if ret:
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(rgb_frame)
-            face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+            face_locations = self.detector.detect(rgb_frame)
+            face_encodings = encode_faces(rgb_frame, face_locations)
             
-            for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding)
-                name = "Nao encontrada"
-                
-                if True in matches:
-                    first_match_index = matches.index(True)
-                    name = self.known_face_names[first_match_index]
-                
+            # Busca o rosto conhecido mais próximo de todos os rostos do frame de uma vez
+            names, _ = self.gallery.nearest(face_encodings, unknown="Nao encontrada")
+            timer.mark("primeiro frame reconhecido")
+            
+            for (top, right, bottom, left), name in zip(face_locations, names):
                 cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
                 cv2.putText(frame, name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 0.5, (255, 255, 255), 1)
             
@@ -89,18 +115,15 @@ class FacialRecognitionApp:
             cv2.destroyAllWindows()
     
     def load_known_faces(self):
-        if os.path.exists("known_faces.pkl"):
-            with open("known_faces.pkl", "rb") as f:
-                data = pickle.load(f)
-                self.known_face_encodings = data["encodings"]
-                self.known_face_names = data["names"]
+        # Amostras agrupadas por pessoa em até 3 protótipos; a busca vai primeiro neles
+        self.gallery = load_prototype_gallery(self.store)
     
-    def save_known_faces(self):
-        with open("known_faces.pkl", "wb") as f:
-            pickle.dump({"encodings": self.known_face_encodings, "names": self.known_face_names}, f)
+    def save_known_face(self, face_encoding, name):
+        # Acrescenta apenas o novo rosto, sem reescrever a galeria
+        self.store.append(face_encoding, name)
     
     def __del__(self):
-        if self.video_capture.isOpened():
+        if self.video_capture is not None and self.video_capture.isOpened():
             self.video_capture.release()
 
 if __name__ == "__main__":
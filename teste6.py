@@ -1,73 +1,138 @@
+from startup import start_warmup, timer
+import threading
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 import cv2
-import face_recognition
 import numpy as np
-from PIL import Image, ImageTk
-import os
-import pickle
+from analysis import encode_faces
+from detectors import get_detector
+from face_store import open_store
+from metrics import Metrics, draw_overlay
+from pipeline import FramePipeline
+from prototypes import load_prototype_gallery
+from scheduler import DetectionScheduler
+from tracking import FaceTracker
+from video_view import VideoView
 
 class FacialRecognitionApp:
     def __init__(self, window):
         self.window = window
         self.window.title("Reconhecimento Facial em Tempo Real")
         
-        self.video_capture = cv2.VideoCapture(0)
-        
-        self.canvas = tk.Canvas(window, width=640, height=480)
-        self.canvas.pack()
+        self.view = VideoView(window, width=640, height=480)
+        self.view.pack()
         
         self.btn_capture = tk.Button(window, text="Capturar e Gerar Encoding", command=self.capture_and_encode)
         self.btn_capture.pack(pady=10)
         
-        self.known_face_encodings = []
-        self.known_face_names = []
+        # Percentis de latência por estágio desenhados sobre o vídeo (opcional)
+        self.show_metrics = tk.BooleanVar(value=False)
+        tk.Checkbutton(window, text="Mostrar métricas", variable=self.show_metrics).pack()
         
-        self.load_known_faces()
+        # Linha de status com fps/latência de cada estágio do pipeline
+        self.status = tk.Label(window, font=("TkFixedFont", 8))
+        self.status.pack()
+        
+        # Detector escolhido pela configuração (FACE_DETECTOR=hog|cnn|ssd)
+        self.detector = get_detector()
+        
+        self.store = open_store()
+        self.gallery = None
+        
+        # Detecção em frame reduzido, com escala/salto ajustados para ~10 fps
+        self.scheduler = DetectionScheduler(self.detector, scale=0.5, target_fps=10)
+        # Guarda encoding e nome por rosto acompanhado, para não recodificar a cada frame
+        self.tracker = FaceTracker(refresh_interval=30)
+        self.faces = []
         
+        # Tempo de cada estágio (captura, cor, detecção, encoding, busca, renderização)
+        self.metrics = Metrics()
+        self.encode = self.metrics.wrap("encode", encode_faces)
+        self.match = self.metrics.wrap("match", lambda face_encodings: self.gallery.nearest(face_encodings, unknown="Desconhecido"))
+        
+        # Modelos, galeria e câmera sobem em segundo plano; a janela aparece antes
+        self.pipeline = None
+        self.warmup = start_warmup(self.detector)
+        threading.Thread(target=self.load_resources, daemon=True).start()
+        
+        self.window.after(0, timer.mark, "primeira janela")
         self.update()
     
-    def update(self):
-        ret, frame = self.video_capture.read()
-        if ret:
+    def load_resources(self):
+        self.load_known_faces()
+        timer.mark("galeria carregada")
+        # Captura e reconhecimento rodam em threads; o loop do Tk só desenha
+        self.pipeline = FramePipeline(0, self.recognize, queue_depth=1, max_frame_age=0.5, metrics=self.metrics).start()
+        timer.mark("câmera aberta")
+    
+    def recognize(self, frame):
+        # Executado na thread de inferência
+        with self.metrics.time("color"):
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(rgb_frame)
-            face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-            
-            for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding)
-                name = "Desconhecido"
-                
-                if True in matches:
-                    first_match_index = matches.index(True)
-                    name = self.known_face_names[first_match_index]
+        with self.metrics.time("detect"):
+            face_locations = self.scheduler.locations(rgb_frame)
+        if not self.scheduler.fresh:
+            # Frame sem detecção nova: mantém as caixas e nomes anteriores
+            return self.faces
+        
+        # Só os rostos novos (ou que mudaram muito) são codificados; a busca na galeria
+        # é feita de uma vez para todos eles
+        tracks = self.tracker.recognize(rgb_frame, face_locations, self.encode, self.match)
+        self.faces = [(track.location, track.name) for track in tracks]
+        timer.mark("primeiro frame reconhecido")
+        return self.faces
+    
+    def update(self):
+        frame, faces = self.pipeline.latest() if self.pipeline is not None else (None, None)
+        if frame is not None:
+            with self.metrics.time("render"):
+                image = frame.image.copy()
+                for (top, right, bottom, left), name in faces or []:
+                    cv2.rectangle(image, (left, top), (right, bottom), (0, 255, 0), 2)
+                    cv2.putText(image, name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 0.5, (255, 255, 255), 1)
+                if self.show_metrics.get():
+                    draw_overlay(image, self.metrics)
                 
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                cv2.putText(frame, name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 0.5, (255, 255, 255), 1)
-            
-            self.photo = ImageTk.PhotoImage(image=Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
-            self.canvas.create_image(0, 0, image=self.photo, anchor=tk.NW)
+                self.view.show(image)
+            self.pipeline.render_stats.record(self.pipeline.latency(frame))
+            self.metrics.record("end_to_end", self.pipeline.latency(frame))
+            self.status.configure(text=" | ".join([str(s) for s in self.pipeline.stats() + [self.view.stats]] + [str(self.scheduler), str(self.tracker)]))
         
         self.window.after(15, self.update)
     
+    def read_frame(self):
+        # O frame mais recente vem da thread de captura
+        frame = self.pipeline.grabber.latest if self.pipeline is not None else None
+        if frame is None:
+            return False, None
+        return True, frame.image.copy()
+    
+    def ready(self):
+        # O botão fica disponível quando a galeria estiver carregada
+        if self.gallery is None:
+            messagebox.showinfo("Aguarde", "Carregando a galeria de rostos conhecidos")
+            return False
+        return True
+    
     def capture_and_encode(self):
-        ret, frame = self.video_capture.read()
+        if not self.ready():
+            return
+        ret, frame = self.read_frame()
         if ret:
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(rgb_frame)
+            face_locations = self.detector.detect(rgb_frame)
             if face_locations:
                 top, right, bottom, left = face_locations[0]
                 face_image = frame[top:bottom, left:right]
                 cv2.imwrite("captured_face.jpg", face_image)
                 
-                face_encoding = face_recognition.face_encodings(rgb_frame, face_locations)[0]
+                face_encoding = encode_faces(rgb_frame, face_locations[:1])[0]
                 
                 name = self.get_person_name()
                 if name:
-                    self.known_face_encodings.append(face_encoding)
-                    self.known_face_names.append(name)
+                    self.gallery.add(face_encoding, name)
                     
-                    self.save_known_faces()
+                    self.save_known_face(face_encoding, name)
                     
                     messagebox.showinfo("Sucesso", f"Rosto capturado e encoding gerado para {name}")
                 else:
@@ -79,19 +144,16 @@ class FacialRecognitionApp:
         return simpledialog.askstring("Nome da Pessoa", "Digite o nome da pessoa capturada:")
     
     def load_known_faces(self):
-        if os.path.exists("known_faces.pkl"):
-            with open("known_faces.pkl", "rb") as f:
-                data = pickle.load(f)
-                self.known_face_encodings = data["encodings"]
-                self.known_face_names = data["names"]
+        # Amostras agrupadas por pessoa em até 3 protótipos; a busca vai primeiro neles
+        self.gallery = load_prototype_gallery(self.store)
     
-    def save_known_faces(self):
-        with open("known_faces.pkl", "wb") as f:
-            pickle.dump({"encodings": self.known_face_encodings, "names": self.known_face_names}, f)
+    def save_known_face(self, face_encoding, name):
+        # Acrescenta apenas o novo rosto, sem reescrever a galeria
+        self.store.append(face_encoding, name)
     
     def __del__(self):
-        if self.video_capture.isOpened():
-            self.video_capture.release()
+        if self.pipeline is not None:
+            self.pipeline.stop()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,87 @@
+import json
+import os
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from face_store import _HEADER_SIZE, _ROW_BYTES, FaceStore, open_store
+from gallery import ENCODING_DIM
+
+
+def encodings(rows, seed=0):
+    return np.random.default_rng(seed).random((rows, ENCODING_DIM), dtype=np.float32)
+
+
+def crash_mid_append(store, encoding, name):
+    """O que sobra de um append_many interrompido: dados e metadados gravados, cabeçalho não"""
+    with open(store.encodings_path, "ab") as f:
+        f.write(encoding.astype("<f4").tobytes())
+        f.write(b"\x00" * (_ROW_BYTES // 3))  # uma linha seguinte pela metade
+    with open(store.records_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"name": name}) + "\n")
+
+
+def test_append_round_trip(tmp_path):
+    store = FaceStore(str(tmp_path / "faces"))
+    data = encodings(3)
+    store.append_many(data, [{"name": n} for n in ("ana", "bia", "caio")])
+    store.append(data[0], "ana", source="teste")
+
+    loaded, records = FaceStore(store.path).load()
+
+    np.testing.assert_array_equal(loaded, np.vstack([data, data[:1]]))
+    assert [r["name"] for r in records] == ["ana", "bia", "caio", "ana"]
+    assert records[-1]["source"] == "teste"
+
+
+def test_crash_mid_append_is_ignored_then_repaired(tmp_path):
+    path = str(tmp_path / "faces")
+    data = encodings(4)
+    FaceStore(path).append_many(data[:2], [{"name": "ana"}, {"name": "bia"}])
+    crash_mid_append(FaceStore(path), data[2], "perdido")
+
+    # Leitura não altera os arquivos e só enxerga as linhas confirmadas pelo cabeçalho
+    size = os.path.getsize(os.path.join(path, "encodings.npy"))
+    loaded, records = FaceStore(path).load()
+    np.testing.assert_array_equal(loaded, data[:2])
+    assert [r["name"] for r in records] == ["ana", "bia"]
+    assert os.path.getsize(os.path.join(path, "encodings.npy")) == size
+
+    # Um novo escritor (processo reiniciado) descarta o que sobrou antes de incluir
+    store = FaceStore(path)
+    store.append(data[3], "caio")
+
+    assert os.path.getsize(store.encodings_path) == _HEADER_SIZE + 3 * _ROW_BYTES
+    assert store._header_rows() == 3
+    np.testing.assert_array_equal(np.load(store.encodings_path), data[[0, 1, 3]])
+    loaded, records = FaceStore(path).load()
+    np.testing.assert_array_equal(loaded, data[[0, 1, 3]])
+    assert [r["name"] for r in records] == ["ana", "bia", "caio"]
+
+
+def test_failed_migration_is_retried(tmp_path, monkeypatch):
+    pickle_path = str(tmp_path / "known_faces.pkl")
+    path = str(tmp_path / "faces")
+    data = encodings(2)
+    with open(pickle_path, "wb") as f:
+        pickle.dump({"encodings": list(data), "names": ["ana", "bia"]}, f)
+
+    def crash(self, *args):
+        raise OSError("disco cheio")
+
+    with monkeypatch.context() as m:
+        m.setattr(FaceStore, "append_many", crash)
+        with pytest.raises(OSError):
+            open_store(path, pickle_path)
+
+    # Nada de galeria vazia no lugar: a próxima abertura migra de novo
+    assert not FaceStore(path).exists()
+    assert os.listdir(tmp_path) == ["known_faces.pkl"]
+    loaded, records = open_store(path, pickle_path).load()
+    np.testing.assert_array_equal(loaded, data)
+    assert [r["name"] for r in records] == ["ana", "bia"]
@@ -0,0 +1,138 @@
+import logging
+import os
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import multicam
+import pipeline
+from multicam import MultiCameraService
+
+CAMERA_FPS = 200
+INFERENCE_SECONDS = 0.01  # um worker dá conta de ~100 frames/s: as câmeras disputam o pool
+
+
+class FakeCapture:
+    """Câmera falsa no lugar do cv2.VideoCapture; a fonte "tarde:<s>" só começa depois de <s> segundos"""
+
+    def __init__(self, source):
+        _, _, delay = str(source).partition(":")
+        self.start = time.perf_counter() + float(delay or 0)
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        return 0.0
+
+    def read(self):
+        time.sleep(max(self.start - time.perf_counter(), 1.0 / CAMERA_FPS))
+        return True, np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+def fake_inference(frames, scale, recognize):
+    time.sleep(INFERENCE_SECONDS)
+    return [(np.empty((0, 4), dtype=np.int32), np.empty((0, 128), dtype=np.float32)) for _ in frames]
+
+
+class FakeExecutor(ThreadPoolExecutor):
+    """Pool de threads no lugar dos processos, com uma inferência falsa de duração fixa"""
+
+    def __init__(self, max_workers, initializer=None, initargs=()):
+        super().__init__(max_workers)
+
+    def submit(self, fn, *args):
+        return super().submit(fake_inference, *args)
+
+
+class StalledExecutor:
+    """Pool em que nenhum frame chega a um worker: só stop() resolve as tarefas (canceladas)"""
+
+    def __init__(self, max_workers, initializer=None, initargs=()):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        if cancel_futures:
+            for future in self.futures:
+                future.cancel()
+
+
+@pytest.fixture
+def make_service(tmp_path, monkeypatch):
+    # Galeria vazia em tmp_path, sem migrar um known_faces.pkl do diretório atual
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline.cv2, "VideoCapture", FakeCapture)
+    monkeypatch.setattr(multicam, "ProcessPoolExecutor", FakeExecutor)
+    services = []
+
+    def make(sources, workers=1):
+        service = MultiCameraService(sources, workers, store=str(tmp_path / "faces")).start()
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.stop()
+
+
+def processed(service):
+    return [source.inference_stats.count for source in service.sources]
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "tempo esgotado"
+        time.sleep(0.005)
+
+
+def test_weights_share_the_pool(make_service):
+    service = make_service([("pesada", 2.0), ("leve", 1.0)])
+
+    time.sleep(1.0)
+    heavy, light = processed(service)
+
+    assert light > 10
+    assert 1.5 <= heavy / light <= 2.6
+
+
+def test_late_source_does_not_starve_the_others(make_service):
+    service = make_service([("a", 1.0), ("b", 1.0), ("tarde:1.0", 1.0)])
+    late = service.sources[2]
+
+    wait_until(lambda: late.inference_stats.count > 0)
+    before = processed(service)
+    time.sleep(0.4)
+    gained = [after - start for after, start in zip(processed(service), before)]
+
+    # Sem o alinhamento, a fonte atrasada levaria o pool inteiro até alcançar as outras (~1 s de frames)
+    assert gained[0] >= 0.2 * sum(gained) and gained[1] >= 0.2 * sum(gained)
+
+
+def test_stop_with_frames_in_flight_releases_sources(make_service, monkeypatch, caplog, capsys):
+    monkeypatch.setattr(multicam, "ProcessPoolExecutor", StalledExecutor)
+    service = make_service([("a", 1.0), ("b", 1.0)], workers=2)
+    wait_until(lambda: all(source.busy for source in service.sources))
+
+    with caplog.at_level(logging.ERROR, logger="concurrent.futures"):
+        service.stop()
+
+    assert not any(source.busy for source in service.sources)
+    assert not [r for r in caplog.records if "exception calling callback" in r.getMessage()]
+    assert processed(service) == [0, 0]
+    # Frame cancelado não é falha de inferência
+    assert "falha" not in capsys.readouterr().out
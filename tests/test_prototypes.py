@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from gallery import ENCODING_DIM, FaceGallery
+from prototypes import PrototypeGallery, synthetic_identities
+
+
+def queries(encodings, seed=1):
+    """Amostras com ruído (perto de alguém) e vetores aleatórios (longe de todos)"""
+    rng = np.random.default_rng(seed)
+    near = encodings[rng.choice(len(encodings), 40)] + rng.normal(scale=0.2 / np.sqrt(ENCODING_DIM),
+                                                                   size=(40, ENCODING_DIM))
+    far = rng.normal(scale=1.0 / np.sqrt(2 * ENCODING_DIM), size=(20, ENCODING_DIM))
+    return np.vstack([near, far]).astype(np.float32)
+
+
+@pytest.mark.parametrize("tolerance", [0.3, 0.45, 0.6, 0.8])
+def test_exact_names_match_flat_gallery(tolerance):
+    encodings, names = synthetic_identities(people=15, samples=8)
+    q = queries(encodings)
+
+    expected, expected_dist = FaceGallery(encodings, names).nearest(q, tolerance)
+    got, got_dist = PrototypeGallery.from_samples(encodings, names).nearest(q, tolerance, exact=True)
+
+    assert got == expected
+    # Quando o nome é conhecido, a distância devolvida nunca é menor que a exata
+    known = [i for i, name in enumerate(expected) if name is not None]
+    assert np.all(got_dist[known] >= expected_dist[known] - 1e-5)
+
+
+def test_exact_names_match_after_extend():
+    encodings, names = synthetic_identities(people=10, samples=6, seed=3)
+    gallery = PrototypeGallery.from_samples(encodings[:30], names[:30])
+    gallery.extend(encodings[30:], names[30:])
+    q = queries(encodings, seed=4)
+
+    expected, _ = FaceGallery(encodings, names).nearest(q, 0.6)
+    got, _ = gallery.nearest(q, 0.6)
+
+    assert got == expected
@@ -0,0 +1,182 @@
+import itertools
+
+import numpy as np
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """IoU entre todas as caixas (top, right, bottom, left) de A e de B"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    top = np.maximum(a[:, None, 0], b[None, :, 0])
+    right = np.minimum(a[:, None, 1], b[None, :, 1])
+    bottom = np.minimum(a[:, None, 2], b[None, :, 2])
+    left = np.maximum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    area_a = (a[:, 1] - a[:, 3]) * (a[:, 2] - a[:, 0])
+    area_b = (b[:, 1] - b[:, 3]) * (b[:, 2] - b[:, 0])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+def centroid_distance_matrix(boxes_a, boxes_b):
+    """Distância entre centros, normalizada pelo tamanho da caixa de A"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    ca = np.stack([(a[:, 1] + a[:, 3]) / 2, (a[:, 0] + a[:, 2]) / 2], axis=1)
+    cb = np.stack([(b[:, 1] + b[:, 3]) / 2, (b[:, 0] + b[:, 2]) / 2], axis=1)
+    size = np.maximum(a[:, 1] - a[:, 3], a[:, 2] - a[:, 0])
+    return np.linalg.norm(ca[:, None, :] - cb[None, :, :], axis=2) / np.maximum(size[:, None], 1.0)
+
+
+def boxes_to_encode(face_locations, encoded_boxes, reencode_iou=0.6):
+    """Índices das caixas sem encoding recente na mesma posição (IoU < `reencode_iou` com todas de `encoded_boxes`)
+
+    Versão sem estado de FaceTracker.stale: com as caixas de FaceTracker.fresh_boxes, quem detecta
+    (um worker, por exemplo) já codifica na mesma passada só os rostos que o tracker vai pedir.
+    """
+    if not len(face_locations):
+        return []
+    if not len(encoded_boxes):
+        return list(range(len(face_locations)))
+    iou = iou_matrix(encoded_boxes, face_locations)
+    return [int(i) for i in np.flatnonzero(iou.max(axis=0) < reencode_iou)]
+
+
+class Track:
+    """Rosto acompanhado entre frames, com encoding e identidade em cache"""
+
+    def __init__(self, track_id, box, frame_index):
+        self.id = track_id
+        self.box = box
+        self.first_frame = frame_index
+        self.last_seen = frame_index
+        self.misses = 0
+
+        self.encoding = None
+        self.name = None
+        self.distance = None
+        self.encoded_box = None
+        self.encoded_frame = None
+
+    @property
+    def location(self):
+        return tuple(int(v) for v in self.box)
+
+
+class FaceTracker:
+    """Associa detecções entre frames por IoU (ou proximidade dos centros) e guarda o encoding de cada track
+
+    Um track só é recodificado quando é novo, quando a caixa mudou muito desde o último encoding
+    (IoU < `reencode_iou`) ou quando passaram `refresh_interval` frames.
+    """
+
+    def __init__(self, min_iou=0.3, max_centroid_distance=0.5, max_misses=5,
+                 reencode_iou=0.6, refresh_interval=30):
+        self.min_iou = min_iou
+        self.max_centroid_distance = max_centroid_distance
+        self.max_misses = max_misses
+        self.reencode_iou = reencode_iou
+        self.refresh_interval = refresh_interval
+
+        self.tracks = []
+        self.frame_index = 0
+        self.encoded = 0  # encodings calculados
+        self.reused = 0  # encodings reaproveitados do cache
+        self._ids = itertools.count(1)
+
+    def update(self, face_locations):
+        """Associa as caixas do frame atual aos tracks; retorna os tracks na ordem das caixas"""
+        self.frame_index += 1
+        boxes = [tuple(box) for box in face_locations]
+        matched = [None] * len(boxes)
+
+        if self.tracks and boxes:
+            track_boxes = [t.box for t in self.tracks]
+            iou = iou_matrix(track_boxes, boxes)
+            centroid = centroid_distance_matrix(track_boxes, boxes)
+            # Pontuação: IoU quando houver sobreposição, senão proximidade dos centros
+            score = np.where(iou >= self.min_iou, 1.0 + iou,
+                             np.where(centroid <= self.max_centroid_distance, 1.0 - centroid, 0.0))
+
+            # Associação gulosa pelos maiores scores
+            used_tracks = set()
+            for flat in np.argsort(-score, axis=None):
+                ti, bi = np.unravel_index(flat, score.shape)
+                if score[ti, bi] <= 0:
+                    break
+                if ti in used_tracks or matched[bi] is not None:
+                    continue
+                used_tracks.add(ti)
+                matched[bi] = self.tracks[ti]
+
+        seen = set()
+        for bi, box in enumerate(boxes):
+            track = matched[bi]
+            if track is None:
+                track = Track(next(self._ids), box, self.frame_index)
+                self.tracks.append(track)
+                matched[bi] = track
+            track.box = box
+            track.last_seen = self.frame_index
+            track.misses = 0
+            seen.add(track.id)
+
+        # Tracks que não apareceram neste frame são removidos depois de `max_misses` frames
+        for track in self.tracks:
+            if track.id not in seen:
+                track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        return matched
+
+    def needs_encoding(self, track):
+        if track.encoding is None:
+            return True
+        if self.frame_index - track.encoded_frame >= self.refresh_interval:
+            return True
+        return iou_matrix([track.encoded_box], [track.box])[0, 0] < self.reencode_iou
+
+    def recognize(self, rgb_frame, face_locations, encode, match):
+        """Atualiza os tracks e calcula encoding/identidade apenas dos que precisam
+
+        encode(rgb_frame, locations) -> lista de encodings
+        match(encodings) -> (identidades, distâncias)
+        """
+        tracks = self.update(face_locations)
+        stale = self.stale(tracks)
+        if stale:
+            # encode pode devolver None para um rosto que não conseguiu codificar
+            encoded = [(t, e) for t, e in zip(stale, encode(rgb_frame, [t.location for t in stale])) if e is not None]
+            if encoded:
+                self.assign(encoded, *match([e for _, e in encoded]))
+        return tracks
+
+    def stale(self, tracks):
+        """Tracks (de `update`) que precisam de encoding; os demais contam como reaproveitados"""
+        stale = [t for t in tracks if self.needs_encoding(t)]
+        self.reused += len(tracks) - len(stale)
+        return stale
+
+    def fresh_boxes(self):
+        """Caixas dos encodings que ainda valem no próximo frame (ver boxes_to_encode)"""
+        frame = self.frame_index + 1
+        return [t.encoded_box for t in self.tracks
+                if t.encoding is not None and frame - t.encoded_frame < self.refresh_interval]
+
+    def assign(self, encoded, names, distances):
+        """Guarda encoding e identidade calculados para os pares (track, encoding)
+
+        Com `stale` e `update`, permite calcular os encodings fora desta thread (por exemplo,
+        aguardando o pool de processos da API) e só depois registrar o resultado.
+        """
+        for (track, encoding), name, distance in zip(encoded, names, distances):
+            track.encoding = encoding
+            track.name = name
+            track.distance = distance
+            track.encoded_box = track.box
+            track.encoded_frame = self.frame_index
+        self.encoded += len(encoded)
+
+    def __str__(self):
+        total = self.encoded + self.reused
+        hit = 100.0 * self.reused / total if total else 0.0
+        return f"tracks: {len(self.tracks)}, encodings reaproveitados {hit:.0f}%"
@@ -0,0 +1,69 @@
+import time
+import tkinter as tk
+
+import cv2
+from PIL import Image, ImageTk
+
+from pipeline import StageStats
+
+
+class VideoView(tk.Canvas):
+    """Área de vídeo para o Tk sem alocações por frame
+
+    Mantém um único item de imagem no canvas e um único PhotoImage, atualizado no lugar com
+    `paste`. A conversão de cor é feita uma vez por frame, em um buffer reaproveitado, e o
+    redimensionamento só acontece quando o tamanho do frame difere do tamanho da área.
+    """
+
+    def __init__(self, master, width=640, height=480, fit=True, **kwargs):
+        super().__init__(master, width=width, height=height, highlightthickness=0, **kwargs)
+        self.fit = fit
+        self.stats = StageStats("renderização")
+        self._size = (width, height)
+        self._photo = None
+        self._item = None
+        self._rgb = None
+        self._resized = None
+        self.bind("<Configure>", self._on_configure)
+
+    def _on_configure(self, event):
+        if self.fit and event.width > 1 and event.height > 1:
+            self._size = (event.width, event.height)
+
+    def _target_size(self, frame):
+        h, w = frame.shape[:2]
+        if not self.fit:
+            return w, h
+        # Mantém a proporção do frame dentro da área
+        scale = min(self._size[0] / w, self._size[1] / h)
+        return max(1, int(w * scale)), max(1, int(h * scale))
+
+    def show(self, frame, bgr=True):
+        """Exibe um frame (BGR do OpenCV por padrão, ou RGB com bgr=False)"""
+        start = time.perf_counter()
+
+        target = self._target_size(frame)
+        if (frame.shape[1], frame.shape[0]) != target:
+            if self._resized is None or self._resized.shape[:2] != (target[1], target[0]):
+                self._resized = None
+            self._resized = cv2.resize(frame, target, dst=self._resized, interpolation=cv2.INTER_AREA)
+            frame = self._resized
+
+        if bgr:
+            if self._rgb is None or self._rgb.shape != frame.shape:
+                self._rgb = None
+            self._rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+            frame = self._rgb
+
+        image = Image.fromarray(frame)
+        if self._photo is None or (self._photo.width(), self._photo.height()) != target:
+            # Só recria o PhotoImage quando o tamanho muda
+            self._photo = ImageTk.PhotoImage(image=image)
+            if self._item is None:
+                self._item = self.create_image(0, 0, image=self._photo, anchor=tk.NW)
+            else:
+                self.itemconfigure(self._item, image=self._photo)
+        else:
+            self._photo.paste(image)
+
+        self.stats.record(time.perf_counter() - start)